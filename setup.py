@@ -13,6 +13,9 @@ setup(
 	install_requires=[
 		'requests',
 	],
+	extras_require={
+		'async': ['aiohttp'],
+	},
 	classifiers=[
 		'Programming Language :: Python :: 3',
 		'License :: OSI Approved :: MIT License',
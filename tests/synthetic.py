@@ -0,0 +1,74 @@
+"""
+Synthetic mp3, aac and Ogg Opus files for the container tests: valid frame and page headers around empty payloads.
+"""
+import struct
+
+from ttsmaker.containers import OGG_BOS, OGG_EOS, OggPage, parse_ogg_page_header
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo, no CRC: 417-byte frames of 1152 samples
+MP3_HEADER = bytes((0xFF, 0xFB, 0x90, 0x00))
+MP3_FRAME = MP3_HEADER + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+
+ADTS_FRAME_LENGTH = 200
+ADTS_FRAME_SECONDS = 1024 / 44100
+
+# Opus TOC byte of a 20 ms stereo CELT frame: 960 samples at 48 kHz
+OPUS_PACKET = b'\xfc' + bytes(20)
+OPUS_PACKET_SAMPLES = 960
+OPUS_PRE_SKIP = 312
+
+
+def id3v2_tag(size=100):
+	syncsafe = bytes((size >> 21 & 0x7F, size >> 14 & 0x7F, size >> 7 & 0x7F, size & 0x7F))
+	return b'ID3\x04\x00\x00' + syncsafe + bytes(size)
+
+
+def mp3_file(frames, tag=False):
+	return (id3v2_tag() if tag else b'') + MP3_FRAME * frames
+
+
+def adts_frame(length=ADTS_FRAME_LENGTH):
+	# AAC LC, 44.1 kHz, 2 channels, no CRC
+	header = bytes((0xFF, 0xF1, 0x50, 0x80 | (length >> 11), (length >> 3) & 0xFF, ((length & 7) << 5) | 0x1F, 0xFC))
+	return header + bytes(length - 7)
+
+
+def aac_file(frames):
+	return adts_frame() * frames
+
+
+def opus_pages(packets, serial=1, packets_per_page=10):
+	"""
+	:return: list of OggPage, the two header pages and the audio pages of an Ogg Opus stream.
+	"""
+	head = b'OpusHead' + bytes((1, 2)) + struct.pack('<HIhB', OPUS_PRE_SKIP, 48000, 0, 0)
+	tags = b'OpusTags' + struct.pack('<I', 6) + b'vendor' + struct.pack('<I', 0)
+	pages = [
+		OggPage(OGG_BOS, 0, serial, 0, bytes((len(head),)), head),
+		OggPage(0, 0, serial, 1, bytes((len(tags),)), tags),
+	]
+	granule = 0
+	for start in range(0, packets, packets_per_page):
+		count = min(packets_per_page, packets - start)
+		granule += count * OPUS_PACKET_SAMPLES
+		pages.append(OggPage(0, granule, serial, len(pages), bytes((len(OPUS_PACKET),)) * count, OPUS_PACKET * count))
+	pages[-1].header_type |= OGG_EOS
+	return pages
+
+
+def opus_file(packets, serial=1, packets_per_page=10):
+	return b''.join(page.to_bytes() for page in opus_pages(packets, serial, packets_per_page))
+
+
+def split_ogg_pages(data):
+	"""
+	:return: list of bytes, the raw pages of an Ogg file.
+	"""
+	pages, offset = [], 0
+	while offset < len(data):
+		header = parse_ogg_page_header(data, offset)
+		assert header is not None, f"No Ogg page at byte {offset}"
+		pages.append(data[offset:offset + header.length])
+		offset += header.length
+	return pages
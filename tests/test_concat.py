@@ -0,0 +1,137 @@
+import io
+
+from synthetic import (
+	ADTS_FRAME_SECONDS,
+	MP3_FRAME,
+	MP3_FRAME_SECONDS,
+	MP3_HEADER,
+	OPUS_PACKET_SAMPLES,
+	aac_file,
+	adts_frame,
+	mp3_file,
+	opus_file,
+	split_ogg_pages,
+)
+from ttsmaker.concat import concat_audio, iter_concat
+from ttsmaker.containers import (
+	OGG_BOS,
+	OGG_EOS,
+	empty_adts_frame,
+	id3v2_size,
+	ogg_page_crc_ok,
+	parse_mpeg_header,
+	parse_ogg_page_header,
+	vbr_info_counts,
+	vorbis_mode_blockflags,
+	xing_frame,
+)
+from ttsmaker.silence import Pause, mpeg_silence
+
+
+def _concat(sources, audio_format):
+	output = io.BytesIO()
+	concat_audio(sources, output, audio_format)
+	return output.getvalue()
+
+
+def test_mp3_join_keeps_first_tag_and_writes_xing_frame():
+	joined = _concat([mp3_file(10, tag=True), mp3_file(5, tag=True)], 'mp3')
+	start = id3v2_size(joined[:10])
+	assert start == 110
+	header = parse_mpeg_header(joined, start)
+	xing = joined[start:start + header.frame_length]
+	frames, size = vbr_info_counts(xing, header)
+	assert frames == 15
+	assert size == len(joined) - start
+	assert joined[start + header.frame_length:] == MP3_FRAME * 15
+
+
+def test_mp3_join_drops_xing_frames_of_segments():
+	segment = xing_frame(MP3_FRAME[:4], 3, 0) + mp3_file(3)
+	joined = b''.join(iter_concat([segment, segment], 'mp3'))
+	assert joined == MP3_FRAME * 6
+
+
+def test_mp3_join_skips_junk_between_frames():
+	segment = MP3_FRAME * 2 + b'junk' + MP3_FRAME * 2
+	assert b''.join(iter_concat([segment], 'mp3')) == MP3_FRAME * 4
+
+
+def test_aac_join_drops_tags():
+	joined = b''.join(iter_concat([b'ID3\x04\x00\x00\x00\x00\x00\x0a' + bytes(10) + aac_file(3), aac_file(2)], 'aac'))
+	assert joined == adts_frame() * 5
+
+
+def test_opus_join_renumbers_pages_into_one_stream():
+	joined = _concat([opus_file(25, serial=1), opus_file(12, serial=2)], 'opus')
+	pages = split_ogg_pages(joined)
+	headers = [parse_ogg_page_header(page) for page in pages]
+	assert all(ogg_page_crc_ok(page) for page in pages)
+	assert {header.serial for header in headers} == {1}
+	assert [header.sequence for header in headers] == list(range(len(pages)))
+	assert [header.header_type & OGG_BOS for header in headers].count(OGG_BOS) == 1
+	assert headers[-1].header_type & OGG_EOS
+	assert not any(header.header_type & OGG_EOS for header in headers[:-1])
+	# Two header pages, then the audio pages of both segments
+	assert len(pages) == 2 + 3 + 2
+	granules = [header.granule for header in headers[2:]]
+	assert granules == [n * OPUS_PACKET_SAMPLES for n in (10, 20, 25, 35, 37)]
+
+
+def test_ogg_page_crc_detects_corruption():
+	page = split_ogg_pages(opus_file(5))[-1]
+	assert ogg_page_crc_ok(page)
+	corrupted = page[:-1] + bytes((page[-1] ^ 1,))
+	assert not ogg_page_crc_ok(corrupted)
+
+
+def _bits(fields):
+	"""Pack (value, width) fields least significant bit first, as Vorbis does."""
+	value = position = 0
+	for field, width in fields:
+		value |= field << position
+		position += width
+	return value.to_bytes((position + 7) // 8, 'little')
+
+
+def test_vorbis_modes_are_found_from_the_end_of_the_setup_header():
+	modes = [False, True, True]
+	fields = [(0x5A5A, 16), (0b101, 3)]
+	fields.append((len(modes) - 1, 6))
+	for mapping, blockflag in enumerate(modes):
+		fields += [(blockflag, 1), (0, 16), (0, 16), (mapping % 2, 8)]
+	fields.append((1, 1))
+	assert vorbis_mode_blockflags(b'\x05vorbis' + _bits(fields)) == modes
+
+
+def test_mp3_pause_adds_silent_frames():
+	joined = b''.join(iter_concat([mp3_file(4), Pause(1.0), mp3_file(4)], 'mp3'))
+	silence = joined[len(MP3_FRAME) * 4:-len(MP3_FRAME) * 4]
+	frames, offset = 0, 0
+	while offset < len(silence):
+		header = parse_mpeg_header(silence, offset)
+		assert header is not None and header.sample_rate == 44100 and header.channels == 2
+		offset += header.frame_length
+		frames += 1
+	assert offset == len(silence)
+	assert frames == round(1.0 / MP3_FRAME_SECONDS)
+
+
+def test_pause_before_the_first_segment_uses_its_format():
+	reference = adts_frame()[:7]
+	joined = b''.join(iter_concat([Pause(0.5), aac_file(2)], 'aac'))
+	assert joined == empty_adts_frame(reference) * round(0.5 / ADTS_FRAME_SECONDS) + aac_file(2)
+
+
+def test_opus_pause_advances_granules():
+	joined = _concat([opus_file(10), Pause(1.0), opus_file(10)], 'opus')
+	headers = [parse_ogg_page_header(page) for page in split_ogg_pages(joined)]
+	assert [header.sequence for header in headers] == list(range(len(headers)))
+	assert headers[-1].granule == 20 * OPUS_PACKET_SAMPLES + 48000
+
+
+def test_pause_between_sources():
+	joined = b''.join(iter_concat([mp3_file(1), mp3_file(1)], 'mp3', pause=0.1))
+	silence, frames = mpeg_silence(MP3_HEADER, 0.1)
+	assert frames == round(0.1 / MP3_FRAME_SECONDS)
+	assert joined == MP3_FRAME + silence + MP3_FRAME
@@ -0,0 +1,118 @@
+import io
+
+import pytest
+from synthetic import (
+	ADTS_FRAME_SECONDS,
+	MP3_FRAME,
+	MP3_FRAME_SECONDS,
+	MP3_HEADER,
+	OPUS_PACKET_SAMPLES,
+	OPUS_PRE_SKIP,
+	aac_file,
+	mp3_file,
+	opus_file,
+	opus_pages,
+	split_ogg_pages,
+)
+from ttsmaker.concat import concat_audio
+from ttsmaker.containers import OGG_BOS, OGG_EOS, OggPage, xing_frame
+from ttsmaker.probe import probe_audio, probe_directory
+
+
+def _problems(info, text):
+	return [problem for problem in info.problems if text in problem]
+
+
+@pytest.mark.parametrize('full', [False, True])
+def test_mp3_duration(full):
+	info = probe_audio(mp3_file(40, tag=True), 'mp3', full)
+	assert info.ok
+	assert info.duration == pytest.approx(40 * MP3_FRAME_SECONDS)
+	assert info.bitrate == pytest.approx(len(MP3_FRAME) * 8 / MP3_FRAME_SECONDS)
+	assert (info.sample_rate, info.channels) == (44100, 2)
+
+
+def test_mp3_duration_from_xing_frame():
+	output = io.BytesIO()
+	concat_audio([mp3_file(30), mp3_file(10)], output, 'mp3')
+	assert probe_audio(output.getvalue(), 'mp3').duration == pytest.approx(40 * MP3_FRAME_SECONDS)
+
+
+def test_truncated_mp3():
+	info = probe_audio(mp3_file(10)[:-100], 'mp3')
+	assert _problems(info, "Truncated frame")
+	assert info.duration == pytest.approx(9 * MP3_FRAME_SECONDS)
+
+
+def test_truncated_mp3_with_xing_frame():
+	output = io.BytesIO()
+	concat_audio([mp3_file(10)], output, 'mp3')
+	data = output.getvalue()[:-len(MP3_FRAME) * 2]
+	assert _problems(probe_audio(data, 'mp3'), "Truncated")
+	assert _problems(probe_audio(data, 'mp3', full=True), "8 frames, 10 announced")
+
+
+def test_truncated_xing_frame():
+	data = (xing_frame(MP3_HEADER, 40, 16680) + MP3_FRAME * 3)[:45]
+	info = probe_audio(data, 'mp3')
+	assert _problems(info, "Truncated Xing frame")
+	assert info.duration == 0
+
+
+def test_directory_sweep_reports_files_that_cannot_be_probed(tmp_path):
+	(tmp_path / 'a.mp3').write_bytes(mp3_file(5))
+	flac = b'\x7fFLAC' + bytes(40)
+	(tmp_path / 'b.ogg').write_bytes(OggPage(OGG_BOS | OGG_EOS, 0, 1, 0, bytes((len(flac),)), flac).to_bytes())
+	(tmp_path / 'c.opus').write_bytes(opus_file(10))
+	results = dict(probe_directory(str(tmp_path)))
+	assert [info.ok for path, info in sorted(results.items())] == [True, False, True]
+	assert _problems(results[str(tmp_path / 'b.ogg')], "Cannot probe")
+
+
+def test_junk_between_mp3_frames():
+	info = probe_audio(MP3_FRAME * 3 + b'junk' + MP3_FRAME * 3, 'mp3')
+	assert _problems(info, "4 bytes of unknown data between frames")
+	assert info.duration == pytest.approx(6 * MP3_FRAME_SECONDS)
+
+
+def test_aac_duration():
+	info = probe_audio(aac_file(50), 'aac')
+	assert info.ok
+	assert info.duration == pytest.approx(50 * ADTS_FRAME_SECONDS)
+
+
+@pytest.mark.parametrize('full', [False, True])
+def test_opus_duration(full):
+	info = probe_audio(opus_file(100), full=full)
+	assert info.audio_format == 'opus'
+	assert info.ok
+	assert info.duration == pytest.approx((100 * OPUS_PACKET_SAMPLES - OPUS_PRE_SKIP) / 48000)
+
+
+@pytest.mark.parametrize('full', [False, True])
+def test_truncated_opus(full):
+	info = probe_audio(opus_file(100)[:-30], 'opus', full)
+	assert _problems(info, "Truncated page")
+
+
+def test_opus_without_end_page():
+	pages = opus_pages(30)
+	pages[-1].header_type = 0
+	info = probe_audio(b''.join(page.to_bytes() for page in pages), 'opus')
+	assert _problems(info, "The stream has no end page")
+
+
+def test_opus_bad_crc_and_missing_page():
+	pages = split_ogg_pages(opus_file(50))
+	corrupted = pages[3][:-1] + bytes((pages[3][-1] ^ 1,))
+	data = b''.join(pages[:3] + [corrupted] + pages[5:])
+	info = probe_audio(data, 'opus', full=True)
+	assert _problems(info, "Bad CRC")
+	assert _problems(info, "Missing pages")
+	# Only the last page is read in quick mode
+	assert probe_audio(data, 'opus').ok
+
+
+def test_unknown_format():
+	with pytest.raises(ValueError):
+		probe_audio(b'not audio')
@@ -1 +1,19 @@
-from .ttsmaker import TTSMaker, TTSError, TTSOrder
\ No newline at end of file
+from .ttsmaker import TTSMaker, TTSError, TransientTTSError, QuotaExhaustedError, TTSOrder, BatchResult
+from .transport import HTTPTransport, RequestTiming
+from .aio import AsyncTTSMaker, AsyncTTSOrder
+from .cache import AudioCache, MemoryCache, DiskCache, TieredCache, cache_key
+from .voices import VoiceCatalog
+from .text import split_text
+from .ratelimit import RateLimiter, TokenBucket
+from .retry import RetryPolicy
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .document import SegmentSynthesizer, DocumentSynthesizer, DocumentRender
+from .template import PhraseTemplate, TemplateSynthesizer
+from .concat import concat_audio, iter_concat
+from .silence import Pause
+from .probe import AudioInfo, probe_audio, probe_directory
+from .quota import QuotaTracker
+from .tokens import TokenPool
+from .hooks import Hooks
+from .metrics import MetricsCollector
+from .hedge import HedgePolicy
@@ -0,0 +1,290 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+
+from .cache import cache_key
+from .ttsmaker import DEFAULT_BASE_URL, DEFAULT_CHUNK_SIZE, JSON_HEADERS, TransientTTSError, TTSError, check_order_response, is_transient_status, order_payload
+from .logs import BatchSummary, log_saved
+from .singleflight import AsyncSingleFlight
+from .utils import atomic_file
+
+
+def _require_aiohttp():
+	try:
+		import aiohttp
+	except ImportError as e:
+		raise ImportError("AsyncTTSMaker requires aiohttp, install it with: pip install ttsmaker[async]") from e
+	return aiohttp
+
+
+async def _run_with_retry(policy, func, on_retry):
+	if policy is None:
+		return await func()
+	return await policy.run_async(func, on_retry)
+
+
+class AsyncTTSOrder:
+	def __init__(self, tts_data, client=None):
+		"""
+		Initialize the AsyncTTSOrder class.
+		:param tts_data: dict, contains relevant information about the generated TTS order.
+		:param client: AsyncTTSMaker, the client whose connection pool and download_retry policy are used to download the audio file.
+		"""
+		self.client = client
+		self.status = tts_data.get('status')
+		self.error_details = tts_data.get('error_details')
+		self.audio_file_url = tts_data.get('audio_file_url')
+		self.audio_file_type = tts_data.get('audio_file_type')
+		self.tts_data = tts_data
+		# Number of retries spent creating this order and downloading its audio, and seconds slept in backoff
+		self.create_retries = 0
+		self.download_retries = 0
+		self.retry_wait = 0.0
+
+	def _on_download_retry(self, retry, error, delay):
+		self.download_retries += 1
+		self.retry_wait += delay
+
+	async def _iter_download(self, chunk_size):
+		aiohttp = _require_aiohttp()
+		session = await self.client._get_session()
+		try:
+			async with session.get(self.audio_file_url) as response:
+				if response.status != 200:
+					error_class = TransientTTSError if is_transient_status(response.status) else TTSError
+					raise error_class(f"Failed to download audio file from URL: {self.audio_file_url}")
+				async for chunk in response.content.iter_chunked(chunk_size):
+					yield chunk
+		except aiohttp.ClientError as e:
+			raise TransientTTSError(f"Failed to download audio file from URL: {self.audio_file_url}: {e}") from e
+
+	async def stream_audio(self, chunk_size=None):
+		"""
+		Download the audio file without buffering it, yielding it chunk by chunk.
+		Failures before the first chunk are retried according to the client's download_retry.
+		:param chunk_size: int, optional, chunk size in bytes. Default is None, which uses the client's chunk_size.
+		:return: async generator of bytes.
+		"""
+		if self.status != 'success':
+			raise TTSError(f"Cannot save audio. TTS generation failed: {self.error_details}")
+
+		async def start():
+			chunks = self._iter_download(chunk_size or self.client.chunk_size)
+			return await anext(chunks, None), chunks
+
+		first, chunks = await _run_with_retry(self.client.download_retry, start, self._on_download_retry)
+		if first is not None:
+			yield first
+			async for chunk in chunks:
+				yield chunk
+
+	async def save_audio(self, filename, chunk_size=None):
+		"""
+		Save the audio file to local storage, streaming it to a temporary file that is renamed once complete.
+		A failed download is retried according to the client's download_retry, without creating a new order.
+		:param filename: str, file name, extension is not required as the audio file type will be used.
+		:param chunk_size: int, optional, chunk size in bytes. Default is None, which uses the client's chunk_size.
+		:return: str, the path of the saved file.
+		"""
+		if self.status != 'success':
+			raise TTSError(f"Cannot save audio. TTS generation failed: {self.error_details}")
+
+		started = time.perf_counter()
+		filepath = f"{filename}.{self.audio_file_type}"
+		size = 0
+
+		async def download():
+			nonlocal size
+			with atomic_file(filepath) as f:
+				async for chunk in self._iter_download(chunk_size or self.client.chunk_size):
+					f.write(chunk)
+				size = f.tell()
+
+		singleflight = self.client.singleflight
+		if singleflight is None:
+			await _run_with_retry(self.client.download_retry, download, self._on_download_retry)
+		else:
+			async def shared_download():
+				await _run_with_retry(self.client.download_retry, download, self._on_download_retry)
+				return filepath
+
+			source, shared = await singleflight.do('download', self.audio_file_url, shared_download)
+			if shared and os.path.abspath(source) != os.path.abspath(filepath):
+				with open(source, 'rb') as src, atomic_file(filepath) as f:
+					shutil.copyfileobj(src, f)
+					size = f.tell()
+			elif shared:
+				size = os.path.getsize(filepath)
+		log_saved(filepath, size, time.perf_counter() - started)
+		return filepath
+
+
+class AsyncTTSMaker:
+	def __init__(self, token='ttsmaker_demo_token', limit=100, limit_per_host=30, max_concurrency=64, chunk_size=DEFAULT_CHUNK_SIZE, rate_limiter=None, create_retry=None, download_retry=None, base_url=None, coalesce=False):
+		"""
+		Initialize the AsyncTTSMaker class with the developer token.
+		:param token: str, developer token for API request authentication, default value is 'ttsmaker_demo_token'.
+		:param limit: int, maximum number of simultaneous connections in the shared pool. Default is 100.
+		:param limit_per_host: int, maximum number of simultaneous connections to a single host. Default is 30.
+		:param max_concurrency: int, maximum number of orders processed at once by synthesize and synthesize_many. Default is 64.
+		:param chunk_size: int, size in bytes of the chunks audio files are downloaded in. Default is 64 KiB.
+		:param rate_limiter: RateLimiter, optional, paces order creation to the account's request and character limits.
+		:param create_retry: RetryPolicy, optional, how transient create_tts_order failures are retried. Default is no retry.
+		:param download_retry: RetryPolicy, optional, how failed audio downloads are retried. Default is no retry.
+		:param base_url: str, optional, API root URL, for example the url of a ttsmaker.testing.MockServer. Default is the public TTSMaker API.
+		:param coalesce: bool, share one order and one download between concurrent identical create_tts_order calls.
+		                 The number of deduplicated calls is reported by singleflight.stats. Default is False.
+		"""
+		self.token = token or 'ttsmaker_demo_token'
+		self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/') + '/'
+		self.limit = limit
+		self.limit_per_host = limit_per_host
+		self.max_concurrency = max_concurrency
+		self.chunk_size = chunk_size
+		self.rate_limiter = rate_limiter
+		self.create_retry = create_retry
+		self.download_retry = download_retry
+		self.singleflight = AsyncSingleFlight() if coalesce else None
+		self._session = None
+		self._semaphore = None
+
+	async def _get_session(self):
+		if self._session is None or self._session.closed:
+			aiohttp = _require_aiohttp()
+			connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+			self._session = aiohttp.ClientSession(connector=connector)
+		return self._session
+
+	@property
+	def semaphore(self):
+		"""asyncio.Semaphore bounding the number of orders in flight."""
+		if self._semaphore is None:
+			self._semaphore = asyncio.Semaphore(self.max_concurrency)
+		return self._semaphore
+
+	async def close(self):
+		"""Close the shared session and release all pooled connections."""
+		if self._session is not None:
+			await self._session.close()
+			self._session = None
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+	async def get_voice_list(self, language='zh'):
+		"""
+		Get the list of available languages and voices.
+		:param language: str, optional parameter, default is 'zh'. See TTSMaker.get_voice_list for available options.
+		                 If None, retrieves the full list of available voices.
+		:return: dict, the JSON response containing the voice list.
+		"""
+		url = f"{self.base_url}get-voice-list"
+		params = {'token': self.token}
+		if language:
+			params['language'] = language
+		session = await self._get_session()
+		async with session.get(url, params=params) as response:
+			return await response.json(content_type=None)
+
+	async def create_tts_order(self, text, voice_id, audio_format='mp3', audio_speed=1.0, audio_volume=0, text_paragraph_pause_time=0):
+		"""
+		Create a TTS order to convert text to speech and generate a downloadable audio file URL.
+		The parameters are the same as TTSMaker.create_tts_order.
+		:return: AsyncTTSOrder, an object containing the TTS order result. If the order fails, a TTSError exception will be raised.
+		"""
+		aiohttp = _require_aiohttp()
+		url = f"{self.base_url}create-tts-order"
+		data = order_payload(self.token, text, voice_id, audio_format, audio_speed, audio_volume, text_paragraph_pause_time)
+		retries = []
+
+		async def post():
+			if self.rate_limiter is not None:
+				await self.rate_limiter.acquire_async(len(text))
+			session = await self._get_session()
+			try:
+				async with session.post(url, headers=JSON_HEADERS, data=json.dumps(data)) as response:
+					if is_transient_status(response.status):
+						raise TransientTTSError(f"TTS generation failed: HTTP {response.status}")
+					return check_order_response(await response.json(content_type=None))
+			except aiohttp.ClientError as e:
+				raise TransientTTSError(f"TTS generation failed: {e}") from e
+
+		async def create():
+			tts_data = await _run_with_retry(self.create_retry, post, lambda retry, error, delay: retries.append(delay))
+			order = AsyncTTSOrder(tts_data, self)
+			order.create_retries = len(retries)
+			order.retry_wait = sum(retries)
+			return order
+
+		if self.singleflight is None:
+			return await create()
+		key = cache_key(text, voice_id, audio_format, audio_speed, audio_volume, text_paragraph_pause_time)
+		order, shared = await self.singleflight.do('order', key, create)
+		return order
+
+	async def get_token_status(self):
+		"""
+		Check the quota characters, used characters, quota reset date, and other information for the developer token.
+		:return: dict, returns the JSON response containing the token status.
+		"""
+		url = f"{self.base_url}get-token-status"
+		params = {'token': self.token}
+		session = await self._get_session()
+		async with session.get(url, params=params) as response:
+			return await response.json(content_type=None)
+
+	async def synthesize(self, text, voice_id, filename, **params):
+		"""
+		Create an order and save its audio, waiting for a free slot of the concurrency semaphore first.
+		:param text: str, the text to be converted into speech.
+		:param voice_id: int, voice ID.
+		:param filename: str, file name without extension.
+		:param params: optional create_tts_order parameters such as audio_format or audio_speed.
+		:return: str, the path of the saved file.
+		"""
+		async with self.semaphore:
+			order = await self.create_tts_order(text, voice_id, **params)
+			return await order.save_audio(filename)
+
+	async def synthesize_many(self, jobs, log_summary=None):
+		"""
+		Run many orders concurrently, at most max_concurrency at a time.
+		:param jobs: iterable of (text, voice_id, filename) or (text, voice_id, filename, params) tuples.
+		:param log_summary: float, optional, seconds between two INFO records of the 'ttsmaker' logger counting the files
+		                    saved and failed so far, a last one being logged when all jobs are done. Default is None, no summary.
+		:return: list, for each job in input order, the saved file path or the TTSError raised by that job.
+		"""
+		summary = BatchSummary(log_summary) if log_summary else None
+
+		async def run(text, voice_id, filename, params):
+			try:
+				filepath = await self.synthesize(text, voice_id, filename, **params)
+			except Exception as e:
+				if summary is not None:
+					summary.add(error=e)
+				raise
+			if summary is not None:
+				summary.add(filepath)
+			return filepath
+
+		tasks = []
+		for job in jobs:
+			text, voice_id, filename, *rest = job
+			params = rest[0] if rest else {}
+			tasks.append(run(text, voice_id, filename, params))
+		try:
+			results = await asyncio.gather(*tasks, return_exceptions=True)
+		finally:
+			if summary is not None:
+				summary.close()
+		for i, result in enumerate(results):
+			if isinstance(result, BaseException) and not isinstance(result, TTSError):
+				error = TTSError(f"TTS job failed: {result}")
+				error.__cause__ = result
+				results[i] = error
+		return results
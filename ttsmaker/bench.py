@@ -0,0 +1,249 @@
+"""
+Client benchmarks against a local MockServer.
+
+	python -m ttsmaker.bench --orders 500 --output benchmarks/results/current.json
+	python -m ttsmaker.bench --compare benchmarks/results/baseline.json
+
+Reports, for serial, threaded and asyncio clients, orders/sec, bytes/sec, peak RSS and p50/p95/p99 latency of
+order creation and download. Results are written as JSON, and --compare exits with status 1 when a throughput
+or latency figure regressed by more than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import AsyncTTSMaker, TTSMaker
+from .testing import MockServer, lognormal
+
+MODES = ('serial', 'threaded', 'async')
+
+
+def percentile(values, q):
+	"""
+	:param values: list of float.
+	:param q: float, percentile between 0 and 100.
+	:return: float, the q-th percentile using linear interpolation, or None if values is empty.
+	"""
+	if not values:
+		return None
+	values = sorted(values)
+	position = (len(values) - 1) * q / 100
+	low = int(position)
+	high = min(low + 1, len(values) - 1)
+	return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def peak_rss():
+	"""
+	:return: int, peak resident set size of this process in bytes, or None where the platform does not report it.
+	         Each mode runs in a process of its own, so that this is the peak of that mode alone.
+	"""
+	try:
+		import resource
+	except ImportError:
+		return None
+	usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def _latency_summary(values):
+	return {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+
+
+def _summary(mode, elapsed, create_times, download_times, total_bytes, errors):
+	orders = len(download_times)
+	return {
+		'mode': mode,
+		'orders': orders,
+		'errors': errors,
+		'elapsed': elapsed,
+		'orders_per_sec': orders / elapsed if elapsed else None,
+		'bytes_per_sec': total_bytes / elapsed if elapsed else None,
+		'create_latency': _latency_summary(create_times),
+		'download_latency': _latency_summary(download_times),
+		'peak_rss': peak_rss(),
+	}
+
+
+def _texts(args):
+	return [f"{i:06d} " + 'x' * max(0, args.text_size - 7) for i in range(args.orders)]
+
+
+def run_sync(mode, base_url, args, output_dir):
+	create_times, download_times, sizes, errors = [], [], [], 0
+	workers = 1 if mode == 'serial' else args.workers
+
+	with TTSMaker(base_url=base_url, pool_maxsize=workers, download_pool_maxsize=workers) as ttsmaker:
+		def job(item):
+			index, text = item
+			started = time.perf_counter()
+			order = ttsmaker.create_tts_order(text, args.voice_id)
+			created = time.perf_counter()
+			filepath = order.save_audio(os.path.join(output_dir, f"{mode}-{index}"))
+			finished = time.perf_counter()
+			return created - started, finished - created, os.path.getsize(filepath)
+
+		started = time.perf_counter()
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			futures = [executor.submit(job, item) for item in enumerate(_texts(args))]
+			for future in futures:
+				try:
+					create_time, download_time, size = future.result()
+				except Exception:
+					errors += 1
+					continue
+				create_times.append(create_time)
+				download_times.append(download_time)
+				sizes.append(size)
+		elapsed = time.perf_counter() - started
+	return _summary(mode, elapsed, create_times, download_times, sum(sizes), errors)
+
+
+def run_async(base_url, args, output_dir):
+	async def main():
+		create_times, download_times, sizes = [], [], []
+
+		async with AsyncTTSMaker(base_url=base_url, max_concurrency=args.concurrency, limit=args.concurrency, limit_per_host=args.concurrency) as ttsmaker:
+			async def job(index, text):
+				async with ttsmaker.semaphore:
+					started = time.perf_counter()
+					order = await ttsmaker.create_tts_order(text, args.voice_id)
+					created = time.perf_counter()
+					filepath = await order.save_audio(os.path.join(output_dir, f"async-{index}"))
+					finished = time.perf_counter()
+				create_times.append(created - started)
+				download_times.append(finished - created)
+				sizes.append(os.path.getsize(filepath))
+
+			started = time.perf_counter()
+			results = await asyncio.gather(*(job(i, text) for i, text in enumerate(_texts(args))), return_exceptions=True)
+			elapsed = time.perf_counter() - started
+		errors = sum(isinstance(result, Exception) for result in results)
+		return _summary('async', elapsed, create_times, download_times, sum(sizes), errors)
+
+	return asyncio.run(main())
+
+
+def run_mode(mode, base_url, args, output_dir):
+	"""
+	Run one benchmark mode in the current process.
+	:return: dict, the result of the mode.
+	"""
+	if mode == 'async':
+		return run_async(base_url, args, output_dir)
+	return run_sync(mode, base_url, args, output_dir)
+
+
+def run(args):
+	"""
+	Run the selected benchmark modes.
+	:param args: argparse.Namespace, as returned by parse_args.
+	:return: dict, the report.
+	"""
+	server_options = {
+		'latency': {'create-tts-order': lognormal(args.create_latency), 'download': lognormal(args.download_latency)},
+		'error_rate': args.error_rate,
+		'quota_characters': args.orders * args.text_size * len(args.modes) + 1,
+		'bytes_per_character': args.bytes_per_character,
+	}
+	results = []
+	with MockServer(**server_options) as server, tempfile.TemporaryDirectory() as output_dir:
+		for mode in args.modes:
+			# A fresh process per mode, since the peak RSS of a process only ever grows
+			with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+				result = executor.submit(run_mode, mode, server.base_url, args, output_dir).result()
+			results.append(result)
+			print(format_result(result), flush=True)
+	return {
+		'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'threshold')},
+		'results': results,
+	}
+
+
+def _ms(value):
+	return '-' if value is None else f"{value * 1000:.1f}ms"
+
+
+def format_result(result):
+	rss = result['peak_rss']
+	return (
+		f"{result['mode']:>8}: {result['orders_per_sec']:.1f} orders/s, {result['bytes_per_sec'] / 1e6:.2f} MB/s, "
+		f"create p50/p95/p99 {'/'.join(_ms(v) for v in result['create_latency'].values())}, "
+		f"download p50/p95/p99 {'/'.join(_ms(v) for v in result['download_latency'].values())}, "
+		f"errors {result['errors']}, peak RSS {'-' if rss is None else f'{rss / 2 ** 20:.1f}MiB'}"
+	)
+
+
+def compare(report, baseline, threshold):
+	"""
+	Compare a report with a baseline report.
+	:param threshold: float, relative change considered a regression, for example 0.1 for 10%.
+	:return: list of str, a description of each regression.
+	"""
+	regressions = []
+	previous = {result['mode']: result for result in baseline.get('results', [])}
+	for result in report['results']:
+		before = previous.get(result['mode'])
+		if before is None:
+			continue
+		for key in ('orders_per_sec', 'bytes_per_sec'):
+			if before.get(key) and result[key] < before[key] * (1 - threshold):
+				regressions.append(f"{result['mode']} {key}: {before[key]:.1f} -> {result[key]:.1f}")
+		for phase in ('create_latency', 'download_latency'):
+			for q, value in result[phase].items():
+				old = before.get(phase, {}).get(q)
+				if old and value is not None and value > old * (1 + threshold):
+					regressions.append(f"{result['mode']} {phase} {q}: {_ms(old)} -> {_ms(value)}")
+	return regressions
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m ttsmaker.bench', description='Benchmark the TTSMaker client against a local mock server.')
+	parser.add_argument('--orders', type=int, default=200, help='orders per mode (default: %(default)s)')
+	parser.add_argument('--modes', type=lambda s: [m for m in s.split(',') if m], default=list(MODES), help='comma separated modes among serial, threaded, async (default: all)')
+	parser.add_argument('--workers', type=int, default=16, help='threads of the threaded mode (default: %(default)s)')
+	parser.add_argument('--concurrency', type=int, default=64, help='tasks in flight in the async mode (default: %(default)s)')
+	parser.add_argument('--text-size', type=int, default=100, help='characters per order (default: %(default)s)')
+	parser.add_argument('--voice-id', type=int, default=1504)
+	parser.add_argument('--bytes-per-character', type=int, default=1000, help='audio bytes per character (default: %(default)s)')
+	parser.add_argument('--create-latency', type=float, default=0.02, help='median server latency of create-tts-order in seconds (default: %(default)s)')
+	parser.add_argument('--download-latency', type=float, default=0.005, help='median server latency before a download in seconds (default: %(default)s)')
+	parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 503 (default: %(default)s)')
+	parser.add_argument('--output', help='write the JSON report to this file')
+	parser.add_argument('--compare', help='baseline JSON report to compare with')
+	parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as a regression (default: %(default)s)')
+	args = parser.parse_args(argv)
+	unknown = set(args.modes) - set(MODES)
+	if unknown:
+		parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+	return args
+
+
+def main(argv=None):
+	args = parse_args(argv)
+	report = run(args)
+	if args.output:
+		os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(report, f, indent=2)
+	if args.compare:
+		with open(args.compare, encoding='utf-8') as f:
+			regressions = compare(report, json.load(f), args.threshold)
+		for regression in regressions:
+			print(f"REGRESSION {regression}")
+		return 1 if regressions else 0
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
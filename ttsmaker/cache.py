@@ -0,0 +1,312 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .utils import atomic_file
+
+
+def cache_key(text, voice_id, audio_format='mp3', audio_speed=1.0, audio_volume=0, text_paragraph_pause_time=0):
+	"""
+	Compute the content address of a synthesis request.
+	Parameters are normalized first, so for example audio_speed=1 and audio_speed=1.0 give the same key.
+	:return: str, hex encoded SHA-256 digest.
+	"""
+	canonical = json.dumps({
+		'text': text,
+		'voice_id': int(voice_id),
+		'audio_format': str(audio_format).lower(),
+		'audio_speed': float(audio_speed),
+		'audio_volume': float(audio_volume),
+		'text_paragraph_pause_time': int(text_paragraph_pause_time),
+	}, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+	return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+	"""
+	Base class of audio cache backends. A backend maps a cache_key to the bytes of an audio file.
+	Subclasses must be safe to use from several threads, and count their hits, misses and evictions with _count.
+	"""
+
+	def __init__(self):
+		self._counters = Counter()
+		self._counters_lock = threading.Lock()
+
+	def _count(self, name, n=1):
+		with self._counters_lock:
+			self._counters[name] += n
+
+	@property
+	def stats(self):
+		"""dict, the number of hits, misses and evictions of this cache."""
+		with self._counters_lock:
+			return {name: self._counters[name] for name in ('hits', 'misses', 'evictions')}
+
+	def get(self, key):
+		"""
+		:param key: str, a key returned by cache_key.
+		:return: bytes, the cached audio, or None on a miss.
+		"""
+		raise NotImplementedError
+
+	def set(self, key, data, audio_format=None):
+		"""
+		:param key: str, a key returned by cache_key.
+		:param data: bytes, the audio file content.
+		:param audio_format: str, optional, the audio file type, for backends that record it.
+		"""
+		raise NotImplementedError
+
+	def __contains__(self, key):
+		return self.get(key) is not None
+
+
+class MemoryCache(AudioCache):
+	"""In-process LRU cache bounded by the total size of the stored audio."""
+
+	def __init__(self, max_bytes=64 * 1024 * 1024):
+		"""
+		:param max_bytes: int, maximum total size of cached audio in bytes. Default is 64 MiB.
+		"""
+		super().__init__()
+		self.max_bytes = max_bytes
+		self.size = 0
+		self._items = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			data = self._items.get(key)
+			if data is not None:
+				self._items.move_to_end(key)
+		self._count('hits' if data is not None else 'misses')
+		return data
+
+	def set(self, key, data, audio_format=None):
+		if len(data) > self.max_bytes:
+			return
+		with self._lock:
+			old = self._items.pop(key, None)
+			if old is not None:
+				self.size -= len(old)
+			self._items[key] = data
+			self.size += len(data)
+			evictions = 0
+			while self.size > self.max_bytes:
+				_, evicted = self._items.popitem(last=False)
+				self.size -= len(evicted)
+				evictions += 1
+		if evictions:
+			self._count('evictions', evictions)
+
+	def __contains__(self, key):
+		with self._lock:
+			return key in self._items
+
+	def __len__(self):
+		return len(self._items)
+
+
+class DiskCache(AudioCache):
+	"""
+	Durable cache shared by every process on a node. Audio is stored as one blob per key in a sharded directory tree,
+	and a SQLite index records the key, size, format, creation and last access time of each blob.
+	When the total size exceeds max_bytes, the least recently used blobs are evicted.
+	The index runs in WAL mode and all updates happen in transactions, so concurrent writers are safe.
+	"""
+
+	def __init__(self, directory, max_bytes=1024 * 1024 * 1024, access_update_interval=60.0):
+		"""
+		:param directory: str, cache directory, created if missing.
+		:param max_bytes: int, maximum total size of cached audio in bytes. Default is 1 GiB.
+		:param access_update_interval: float, seconds during which repeated hits on a key do not update its last access time,
+		                               to spare index writes on hot keys. Default is 60.
+		"""
+		super().__init__()
+		self.directory = os.path.expanduser(directory)
+		self.max_bytes = max_bytes
+		self.access_update_interval = access_update_interval
+		self.index_path = os.path.join(self.directory, 'index.sqlite3')
+		self._local = threading.local()
+		os.makedirs(self.directory, exist_ok=True)
+		db = self._db()
+		with db:
+			db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER NOT NULL, format TEXT, created REAL NOT NULL, last_access REAL NOT NULL)')
+			db.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+			db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+			db.execute("INSERT OR IGNORE INTO meta VALUES ('total_size', 0)")
+
+	def _db(self):
+		db = getattr(self._local, 'db', None)
+		if db is None:
+			db = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+			db.execute('PRAGMA journal_mode=WAL')
+			db.execute('PRAGMA synchronous=NORMAL')
+			self._local.db = db
+		return db
+
+	def _path(self, key):
+		return os.path.join(self.directory, key[:2], key[2:4], key)
+
+	@property
+	def size(self):
+		"""int, total size of the cached audio in bytes."""
+		return self._db().execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+	def __len__(self):
+		return self._db().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+	def __contains__(self, key):
+		return self.info(key) is not None
+
+	def info(self, key):
+		"""
+		:param key: str, a key returned by cache_key.
+		:return: dict with the size, format, created and last_access of the entry, or None if the key is not cached.
+		"""
+		row = self._db().execute('SELECT size, format, created, last_access FROM entries WHERE key = ?', (key,)).fetchone()
+		if row is None:
+			return None
+		return dict(zip(('size', 'format', 'created', 'last_access'), row))
+
+	def get(self, key):
+		db = self._db()
+		row = db.execute('SELECT last_access FROM entries WHERE key = ?', (key,)).fetchone()
+		if row is None:
+			self._count('misses')
+			return None
+		try:
+			with open(self._path(key), 'rb') as f:
+				data = f.read()
+		except FileNotFoundError:
+			self._delete(key)
+			self._count('misses')
+			return None
+		self._count('hits')
+		now = time.time()
+		if now - row[0] >= self.access_update_interval:
+			db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+		return data
+
+	def set(self, key, data, audio_format=None):
+		if len(data) > self.max_bytes:
+			return
+		path = self._path(key)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with atomic_file(path) as f:
+			f.write(data)
+
+		now = time.time()
+		db = self._db()
+		db.execute('BEGIN IMMEDIATE')
+		try:
+			row = db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+			old_size = row[0] if row else 0
+			db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, len(data), audio_format, now, now))
+			db.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (len(data) - old_size,))
+			evicted = self._evict(db)
+			db.execute('COMMIT')
+		except BaseException:
+			db.execute('ROLLBACK')
+			raise
+		for evicted_key in evicted:
+			self._remove_blob(evicted_key)
+		if evicted:
+			self._count('evictions', len(evicted))
+
+	def _evict(self, db):
+		total = db.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+		if total <= self.max_bytes:
+			return []
+		evicted, freed = [], 0
+		cursor = db.execute('SELECT key, size FROM entries ORDER BY last_access')
+		for key, size in cursor:
+			if total - freed <= self.max_bytes:
+				break
+			evicted.append(key)
+			freed += size
+		cursor.close()
+		db.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in evicted])
+		db.execute("UPDATE meta SET value = value - ? WHERE name = 'total_size'", (freed,))
+		return evicted
+
+	def _remove_blob(self, key):
+		try:
+			os.remove(self._path(key))
+		except FileNotFoundError:
+			pass
+
+	def _delete(self, key):
+		db = self._db()
+		db.execute('BEGIN IMMEDIATE')
+		try:
+			row = db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+			if row is not None:
+				db.execute('DELETE FROM entries WHERE key = ?', (key,))
+				db.execute("UPDATE meta SET value = value - ? WHERE name = 'total_size'", (row[0],))
+			db.execute('COMMIT')
+		except BaseException:
+			db.execute('ROLLBACK')
+			raise
+
+	def delete(self, key):
+		"""Remove key from the cache."""
+		self._delete(key)
+		self._remove_blob(key)
+
+	def close(self):
+		"""Close the index connection of the current thread."""
+		db = getattr(self._local, 'db', None)
+		if db is not None:
+			db.close()
+			self._local.db = None
+
+
+class TieredCache(AudioCache):
+	"""
+	Two-tier cache: a MemoryCache for hot audio in front of a DiskCache for the long tail.
+	Writes go to both tiers, and disk hits are promoted to memory.
+	"""
+
+	def __init__(self, disk, memory=None):
+		"""
+		:param disk: AudioCache, the second tier, usually a DiskCache.
+		:param memory: AudioCache, optional, the first tier. Default is a MemoryCache of 64 MiB.
+		"""
+		super().__init__()
+		self.disk = disk
+		self.memory = memory if memory is not None else MemoryCache()
+
+	def get(self, key):
+		data = self.memory.get(key)
+		if data is not None:
+			self._count('hits')
+			return data
+		data = self.disk.get(key)
+		if data is None:
+			self._count('misses')
+			return None
+		self._count('hits')
+		self._count('promotions')
+		self.memory.set(key, data)
+		return data
+
+	def __contains__(self, key):
+		return key in self.memory or key in self.disk
+
+	def set(self, key, data, audio_format=None):
+		self.disk.set(key, data, audio_format)
+		self.memory.set(key, data, audio_format)
+
+	@property
+	def stats(self):
+		"""dict, overall hits, misses and promotions, and the hits, misses and evictions of each tier."""
+		with self._counters_lock:
+			stats = {name: self._counters[name] for name in ('hits', 'misses', 'promotions')}
+		stats['memory'] = self.memory.stats
+		stats['disk'] = self.disk.stats
+		return stats
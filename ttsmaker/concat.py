@@ -0,0 +1,431 @@
+import io
+import os
+from contextlib import contextmanager
+
+from .containers import (
+	ID3V2_HEADER_SIZE,
+	OGG_BOS,
+	OGG_CONTINUED,
+	OGG_EOS,
+	OggCodec,
+	OggPage,
+	TRAILING_TAGS_SCAN,
+	find_adts_frame,
+	find_mpeg_frame,
+	id3v2_size,
+	is_vbr_info_frame,
+	ogg_header_packet_count,
+	parse_mpeg_header,
+	read_ogg_page,
+	trailing_tags_size,
+	xing_frame,
+)
+from .silence import Pause, adts_silence, mpeg_silence, ogg_silence
+from .utils import DEFAULT_CHUNK_SIZE, atomic_file
+
+
+@contextmanager
+def _open(source):
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		yield io.BytesIO(source)
+	elif hasattr(source, 'read'):
+		yield source
+	else:
+		with open(source, 'rb') as f:
+			yield f
+
+
+def _copy_range(f, start, end, chunk_size):
+	f.seek(start)
+	remaining = end - start
+	while remaining > 0:
+		chunk = f.read(min(chunk_size, remaining))
+		if not chunk:
+			break
+		remaining -= len(chunk)
+		yield chunk
+
+
+def _frames_range(f, find_frame, scan_bytes=64 * 1024):
+	"""
+	:return: tuple of (id3v2 tag size, offset of the first frame, its header, the first frame bytes, end of the frames).
+	"""
+	size = f.seek(0, io.SEEK_END)
+	f.seek(0)
+	tag_size = id3v2_size(f.read(ID3V2_HEADER_SIZE))
+	f.seek(tag_size)
+	head = f.read(scan_bytes)
+	offset, header = find_frame(head)
+	f.seek(max(0, size - TRAILING_TAGS_SCAN))
+	end = max(tag_size, size - trailing_tags_size(f.read(TRAILING_TAGS_SCAN)))
+	if offset is None:
+		return tag_size, tag_size, None, b'', end
+	return tag_size, tag_size + offset, header, head[offset:offset + header.frame_length], end
+
+
+def _iter_mpeg_frames(f, start, end, chunk_size):
+	"""
+	Walk the MPEG frames between start and end. Bytes that are not part of a whole frame are skipped.
+	:return: generator of tuples of (bytes of consecutive frames, number of frames).
+	"""
+	f.seek(start)
+	remaining = end - start
+	buffer = b''
+	while True:
+		chunk = f.read(min(chunk_size, remaining)) if remaining > 0 else b''
+		remaining -= len(chunk)
+		data = buffer + chunk
+		last = not chunk
+		offset = run = frames = 0
+		while offset < len(data):
+			header = parse_mpeg_header(data, offset)
+			if header is not None and offset + header.frame_length <= len(data):
+				offset += header.frame_length
+				frames += 1
+				continue
+			if not last and (header is not None or len(data) - offset < 4):
+				# The frame continues in the next chunk
+				break
+			if frames:
+				yield data[run:offset], frames
+				frames = 0
+			sync = data.find(b'\xff', offset + 1)
+			offset = run = len(data) if sync < 0 else sync
+		if frames:
+			yield data[run:offset], frames
+		if last:
+			return
+		buffer = data[offset:]
+
+
+def _concat_mpeg(sources, chunk_size, xing=None):
+	"""
+	:param xing: dict, optional. When given, a placeholder Xing frame is written before the audio frames,
+	             and once the generator is exhausted xing['offset'] and xing['frame'] hold its position in the output
+	             and the Xing frame with the final counts, to be written over the placeholder.
+	"""
+	position = frames = size = 0
+	reference = None
+	pending = 0.0
+	first = True
+	for source in sources:
+		if isinstance(source, Pause):
+			if reference is None:
+				pending += source.seconds
+				continue
+			silence, count = mpeg_silence(reference, source.seconds)
+			frames += count
+			size += len(silence)
+			yield silence
+			continue
+		with _open(source) as f:
+			tag_size, start, header, frame, end = _frames_range(f, find_mpeg_frame)
+			if first and tag_size:
+				# The ID3v2 tag of the first segment is kept as the tag of the whole file
+				for chunk in _copy_range(f, 0, tag_size, chunk_size):
+					position += len(chunk)
+					yield chunk
+			first = False
+			if header is None:
+				# Not MPEG audio, copied as is
+				for chunk in _copy_range(f, start, end, chunk_size):
+					position += len(chunk)
+					yield chunk
+				continue
+			if is_vbr_info_frame(frame, header):
+				# A Xing/Info frame describes the length of its own segment only
+				start += header.frame_length
+			if xing is not None and 'offset' not in xing:
+				xing['offset'] = position
+				xing['reference'] = frame[:4]
+				placeholder = xing_frame(frame, 0, 0)
+				size += len(placeholder)
+				yield placeholder
+			reference = frame[:4]
+			if pending:
+				silence, count = mpeg_silence(reference, pending)
+				frames += count
+				size += len(silence)
+				pending = 0.0
+				yield silence
+			for chunk, count in _iter_mpeg_frames(f, start, end, chunk_size):
+				frames += count
+				size += len(chunk)
+				yield chunk
+	if xing is not None and 'offset' in xing:
+		xing['frame'] = xing_frame(xing['reference'], frames, size)
+
+
+def _concat_adts(sources, chunk_size):
+	reference = None
+	pending = 0.0
+	for source in sources:
+		if isinstance(source, Pause):
+			if reference is None:
+				pending += source.seconds
+			else:
+				yield adts_silence(reference, source.seconds)
+			continue
+		with _open(source) as f:
+			tag_size, start, header, frame, end = _frames_range(f, find_adts_frame)
+			if header is not None:
+				reference = frame[:7]
+				if pending:
+					yield adts_silence(reference, pending)
+					pending = 0.0
+			yield from _copy_range(f, start, end, chunk_size)
+
+
+def _read_ogg_headers(f):
+	"""
+	:return: tuple of (header pages, header packets, serial) of the first logical stream in f.
+	"""
+	pages, packets, partial, needed = [], [], b'', None
+	while needed is None or len(packets) < needed:
+		page = read_ogg_page(f)
+		if page is None:
+			raise ValueError("Ogg stream ends inside its headers")
+		if pages and page.serial != pages[0].serial:
+			continue
+		pages.append(page)
+		parts = page.packets()
+		for i, part in enumerate(parts):
+			partial += part
+			if i < len(parts) - 1 or page.lacing[-1] < 255:
+				packets.append(partial)
+				partial = b''
+				if needed is None:
+					needed = ogg_header_packet_count(packets[0])
+	return pages, packets, pages[0].serial
+
+
+def _same_codec_setup(a, b):
+	if a[0].startswith(b'OpusHead'):
+		# Everything but the pre-skip and the informative input sample rate
+		return a[0][:10] + a[0][16:] == b[0][:10] + b[0][16:]
+	return a[0] == b[0] and a[2] == b[2]
+
+
+class _OggStream:
+	"""
+	A logical stream being written. Its pages get its serial number, consecutive sequence numbers
+	and granule positions counted from the start of the stream. The last page is held back until the next one,
+	as it ends the stream unless more pages follow.
+	"""
+
+	def __init__(self, headers, serial):
+		self.headers = headers
+		self.codec = OggCodec(headers)
+		self.serial = serial
+		self.sequence = 0
+		# Samples decoded so far, and the block value of the last packet
+		self.samples = 0
+		self.previous = 0
+		self.held = None
+		self.held_samples = None
+
+	def count(self, packet):
+		"""Count the samples of the next packet of the stream."""
+		block = self.codec.block(packet)
+		self.samples += self.codec.samples(block, self.previous)
+		self.previous = block
+
+	def write(self, page):
+		"""
+		:return: bytes, the previously held page.
+		"""
+		page.serial, page.sequence = self.serial, self.sequence
+		page.header_type &= ~(OGG_BOS | OGG_EOS)
+		self.sequence += 1
+		held, self.held = self.held, page
+		if held is None:
+			return b''
+		if self.held_samples is not None:
+			# The last page of a segment may trim the padding of its last packet, which only the end of a stream can do
+			held.granule = self.held_samples
+			self.held_samples = None
+		return held.to_bytes()
+
+	def write_header(self, page):
+		page.serial, page.sequence = self.serial, self.sequence
+		self.sequence += 1
+		return page.to_bytes()
+
+	def end_segment(self):
+		if self.held is not None:
+			self.held_samples = self.samples
+
+	def silence(self, seconds, packets_per_page=50):
+		"""
+		:return: generator of bytes, pages of silent packets.
+		"""
+		packets = ogg_silence(self.codec, seconds)
+		for start in range(0, len(packets), packets_per_page):
+			batch = packets[start:start + packets_per_page]
+			for packet in batch:
+				self.count(packet)
+			yield self.write(OggPage(0, self.samples, 0, 0, bytes(len(packet) for packet in batch), b''.join(batch)))
+		self.end_segment()
+
+	def close(self):
+		"""
+		:return: bytes, the held page, marked as the end of the stream.
+		"""
+		if self.held is None:
+			return b''
+		self.held.header_type |= OGG_EOS
+		held, self.held = self.held, None
+		return held.to_bytes()
+
+
+def _concat_ogg(sources):
+	"""
+	Join Ogg Vorbis or Ogg Opus files. Segments with the same codec setup are merged into one logical stream:
+	their header pages are dropped, and their pages get the serial number of the stream, renumbered page sequence numbers
+	and granule positions offset by the samples of the preceding segments. A segment with a different setup starts
+	a new chained stream. Pauses are pages of silent packets in the current stream.
+	"""
+	stream = None
+	pending = 0.0
+	for source in sources:
+		if isinstance(source, Pause):
+			if stream is None:
+				pending += source.seconds
+			else:
+				yield from stream.silence(source.seconds)
+			continue
+		with _open(source) as f:
+			header_pages, headers, source_serial = _read_ogg_headers(f)
+			if stream is None or not _same_codec_setup(stream.headers, headers):
+				if stream is None:
+					serial = source_serial
+				else:
+					serial = (stream.serial + 1) & 0xFFFFFFFF
+					yield stream.close()
+				stream = _OggStream(headers, serial)
+				for page in header_pages:
+					yield stream.write_header(page)
+				if pending:
+					yield from stream.silence(pending)
+					pending = 0.0
+
+			# Samples the segment decodes to on its own, and the block value of its last packet
+			own = own_previous = 0
+			partial = None
+			while True:
+				page = read_ogg_page(f)
+				if page is None:
+					break
+				if page.serial != source_serial:
+					continue
+				parts = page.packets()
+				for i, part in enumerate(parts):
+					if i == 0 and page.header_type & OGG_CONTINUED and partial is not None:
+						part = partial
+					if i < len(parts) - 1 or page.lacing[-1] < 255:
+						block = stream.codec.block(part)
+						own += stream.codec.samples(block, own_previous)
+						own_previous = block
+						stream.count(part)
+						partial = None
+					else:
+						partial = part
+				if page.granule != -1:
+					page.granule += stream.samples - own
+				yield stream.write(page)
+			stream.end_segment()
+	if stream is not None:
+		yield stream.close()
+
+
+def _concat_raw(sources, chunk_size):
+	for source in sources:
+		if isinstance(source, Pause):
+			raise ValueError("Pauses are only supported for mp3, aac, ogg and opus")
+		with _open(source) as f:
+			while True:
+				chunk = f.read(chunk_size)
+				if not chunk:
+					break
+				yield chunk
+
+
+def _with_pauses(sources, pause):
+	for index, source in enumerate(sources):
+		if index:
+			yield Pause(pause)
+		yield source
+
+
+def iter_concat(sources, audio_format, chunk_size=DEFAULT_CHUNK_SIZE, pause=None):
+	"""
+	Join audio segments of the same format without re-encoding, yielding the output in chunks.
+	Segments are opened one at a time, so only one is read at once.
+
+	- mp3: the ID3v2 tag of the first segment is kept, other ID3v2, ID3v1 and APE tags and Xing/Info frames are dropped.
+	  Without a Xing frame, players estimate the length of a VBR file from its first frame; concat_audio writes one
+	  when the output is seekable.
+	- aac: ADTS frames are joined and ID3 tags are dropped.
+	- ogg, opus: segments are merged into one logical Ogg stream with renumbered pages and offset granule positions.
+	- other formats are joined byte by byte.
+
+	Pause(seconds) items among the sources insert silence, made of frames or packets that carry no audio data
+	in the format and channel layout of the neighbouring segments. Pauses are not limited in number or length,
+	and are rounded to whole frames: 20 ms for opus, around 20 to 60 ms for the other formats.
+
+	:param sources: iterable of file paths, bytes, binary file objects or Pause, in order.
+	:param audio_format: str, the audio file type of the segments.
+	:param chunk_size: int, size in bytes of the chunks copied from mp3, aac and other segments. Default is 64 KiB.
+	:param pause: float, optional, seconds of silence inserted between consecutive sources.
+	:return: generator of bytes.
+	"""
+	if pause:
+		sources = _with_pauses(sources, pause)
+	audio_format = (audio_format or '').lower()
+	if audio_format == 'mp3':
+		return _concat_mpeg(sources, chunk_size)
+	if audio_format == 'aac':
+		return _concat_adts(sources, chunk_size)
+	if audio_format in ('ogg', 'opus'):
+		return _concat_ogg(sources)
+	return _concat_raw(sources, chunk_size)
+
+
+def concat_audio(sources, output, audio_format=None, chunk_size=DEFAULT_CHUNK_SIZE, pause=None):
+	"""
+	Join audio segments into a file, see iter_concat.
+	:param sources: iterable of file paths, bytes, binary file objects or Pause, in order.
+	:param output: str or binary file object. A path is written to a temporary file and renamed once complete.
+	:param audio_format: str, optional, the audio file type. Default is None, which uses the extension of output.
+	:param chunk_size: int, size in bytes of the chunks copied. Default is 64 KiB.
+	:param pause: float, optional, seconds of silence inserted between consecutive sources.
+	:return: output
+	"""
+	if audio_format is None:
+		if hasattr(output, 'write'):
+			raise ValueError("audio_format is required when output is a file object")
+		audio_format = os.path.splitext(output)[1].lstrip('.')
+	if pause:
+		sources = _with_pauses(sources, pause)
+	if hasattr(output, 'write'):
+		_write_concat(sources, output, audio_format, chunk_size)
+		return output
+	with atomic_file(output) as f:
+		_write_concat(sources, f, audio_format, chunk_size)
+	return output
+
+
+def _write_concat(sources, f, audio_format, chunk_size):
+	if audio_format.lower() != 'mp3' or not f.seekable():
+		for chunk in iter_concat(sources, audio_format, chunk_size):
+			f.write(chunk)
+		return
+	xing = {}
+	start = f.tell()
+	for chunk in _concat_mpeg(sources, chunk_size, xing):
+		f.write(chunk)
+	if 'frame' in xing:
+		end = f.tell()
+		f.seek(start + xing['offset'])
+		f.write(xing['frame'])
+		f.seek(end)
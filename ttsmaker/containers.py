@@ -0,0 +1,512 @@
+"""
+Low-level parsing of the audio containers returned by the API: MPEG audio (mp3), ADTS (aac) and Ogg (ogg, opus).
+Only headers are parsed, audio is never decoded.
+"""
+import struct
+import zlib
+from typing import NamedTuple
+
+ID3V2_HEADER_SIZE = 10
+ID3V1_SIZE = 128
+
+_MPEG_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+_MPEG_LAYERS = {1: 3, 2: 2, 3: 1}
+_MPEG_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+# Bitrates in kbit/s by (version 1 or not, layer), indexed by the 4-bit bitrate index
+_MPEG_BITRATES = {
+	(True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+	(True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+	(True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+	(False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+	(False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+	(False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+ADTS_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+
+def id3v2_size(header):
+	"""
+	:param header: bytes, the first 10 bytes of a file.
+	:return: int, total size of the ID3v2 tag starting the file, footer included, or 0 if there is none.
+	"""
+	if len(header) < ID3V2_HEADER_SIZE or header[:3] != b'ID3':
+		return 0
+	size = 0
+	for byte in header[6:10]:
+		size = (size << 7) | (byte & 0x7F)
+	footer = ID3V2_HEADER_SIZE if header[5] & 0x10 else 0
+	return ID3V2_HEADER_SIZE + size + footer
+
+
+# Bytes at the end of a file holding its ID3v1 tag and the footer of an APEv2 tag before it
+TRAILING_TAGS_SCAN = ID3V1_SIZE + 32
+
+
+def trailing_tags_size(tail):
+	"""
+	:param tail: bytes, the last TRAILING_TAGS_SCAN bytes of a file, or the whole file if it is shorter.
+	:return: int, total size of the ID3v1 and APEv2 tags ending the file. It can exceed len(tail).
+	"""
+	end = len(tail)
+	if end >= ID3V1_SIZE and tail[end - ID3V1_SIZE:end - ID3V1_SIZE + 3] == b'TAG':
+		end -= ID3V1_SIZE
+	size = len(tail) - end
+	if end >= 32 and tail[end - 32:end - 24] == b'APETAGEX':
+		tag_size, flags = struct.unpack('<I4xI', tail[end - 20:end - 8])
+		size += tag_size + (32 if flags & 0x80000000 else 0)
+	return size
+
+
+class MPEGFrameHeader(NamedTuple):
+	version: float
+	layer: int
+	bitrate: int
+	sample_rate: int
+	padding: int
+	channels: int
+	frame_length: int
+	samples: int
+
+	@property
+	def duration(self):
+		return self.samples / self.sample_rate
+
+
+def parse_mpeg_header(data, offset=0):
+	"""
+	:param data: bytes, buffer holding at least 4 bytes at offset.
+	:return: MPEGFrameHeader, or None if the bytes at offset are not a valid MPEG audio frame header.
+	"""
+	if len(data) < offset + 4 or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+		return None
+	b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+	version = _MPEG_VERSIONS.get((b1 >> 3) & 3)
+	layer = _MPEG_LAYERS.get((b1 >> 1) & 3)
+	bitrate_index = b2 >> 4
+	sample_rate_index = (b2 >> 2) & 3
+	if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+		return None
+	bitrate = _MPEG_BITRATES[(version == 1, layer)][bitrate_index] * 1000
+	sample_rate = _MPEG_SAMPLE_RATES[version][sample_rate_index]
+	padding = (b2 >> 1) & 1
+	channels = 1 if b3 >> 6 == 3 else 2
+	if layer == 1:
+		samples = 384
+		frame_length = (12 * bitrate // sample_rate + padding) * 4
+	elif layer == 2 or version == 1:
+		samples = 1152
+		frame_length = 144 * bitrate // sample_rate + padding
+	else:
+		samples = 576
+		frame_length = 72 * bitrate // sample_rate + padding
+	return MPEGFrameHeader(version, layer, bitrate, sample_rate, padding, channels, frame_length, samples)
+
+
+def find_mpeg_frame(data, offset=0):
+	"""
+	Find the first MPEG audio frame at or after offset whose header is followed by another valid header,
+	which rules out most false syncs in tag data.
+	:return: tuple of (offset, MPEGFrameHeader), or (None, None) if there is no frame in data.
+	"""
+	while True:
+		offset = data.find(b'\xff', offset)
+		if offset < 0:
+			return None, None
+		header = parse_mpeg_header(data, offset)
+		if header is not None:
+			following = offset + header.frame_length
+			if following + 4 > len(data) or parse_mpeg_header(data, following) is not None:
+				return offset, header
+		offset += 1
+
+
+def xing_offset(header):
+	"""
+	:return: int, offset of a Xing/Info tag from the start of a frame with this header.
+	"""
+	if header.version == 1:
+		return 4 + (17 if header.channels == 1 else 32)
+	return 4 + (9 if header.channels == 1 else 17)
+
+
+def is_vbr_info_frame(frame, header):
+	"""
+	:param frame: bytes, a whole frame.
+	:return: bool, True if the frame carries a Xing, Info or VBRI tag rather than audio.
+	"""
+	offset = xing_offset(header)
+	return frame[offset:offset + 4] in (b'Xing', b'Info') or frame[36:40] == b'VBRI'
+
+
+def vbr_info_counts(frame, header):
+	"""
+	:param frame: bytes, the first frame of a file.
+	:return: tuple of (number of audio frames, size in bytes) announced by the Xing, Info or VBRI tag of the frame,
+	         either being None when absent, or None if the frame has no such tag.
+	         A ValueError is raised if the frame is too short for the fields of its tag.
+	"""
+	offset = xing_offset(header)
+	if frame[offset:offset + 4] in (b'Xing', b'Info'):
+		if len(frame) < offset + 8:
+			raise ValueError("Truncated Xing frame")
+		flags = struct.unpack('>I', frame[offset + 4:offset + 8])[0]
+		position = offset + 8
+		if len(frame) < position + 4 * ((flags & 1) + (flags >> 1 & 1)):
+			raise ValueError("Truncated Xing frame")
+		frames = size = None
+		if flags & 1:
+			frames = struct.unpack('>I', frame[position:position + 4])[0]
+			position += 4
+		if flags & 2:
+			size = struct.unpack('>I', frame[position:position + 4])[0]
+		return frames, size
+	if frame[36:40] == b'VBRI':
+		if len(frame) < 54:
+			raise ValueError("Truncated VBRI frame")
+		size, frames = struct.unpack('>II', frame[46:54])
+		return frames, size
+	return None
+
+
+def empty_mpeg_frame(reference, min_length=0):
+	"""
+	Build a Layer III frame whose side information is all zeros: it has no main data and decodes to silence.
+	:param reference: bytes, the 4-byte header of an audio frame of the stream, for its version, sample rate and channel mode.
+	:param min_length: int, minimum frame length in bytes. The lowest bitrate giving at least this length
+	                   and room for the side information is used.
+	:return: bytes, the frame.
+	"""
+	header = parse_mpeg_header(reference)
+	if header is None or header.layer != 3:
+		raise ValueError("Not an MPEG Layer III frame header")
+	min_length = max(min_length, xing_offset(header))
+	b1 = reference[1] | 1  # no CRC
+	for bitrate_index in range(1, 15):
+		frame_header = bytes((0xFF, b1, (bitrate_index << 4) | (reference[2] & 0x0C), reference[3] & 0xF0))
+		length = parse_mpeg_header(frame_header).frame_length
+		if length >= min_length:
+			break
+	return frame_header + bytes(length - 4)
+
+
+def xing_frame(reference, frames, size):
+	"""
+	Build a Layer III Xing frame, the silent first frame that gives decoders the length of a VBR file.
+	:param reference: bytes, the 4-byte header of an audio frame of the file, for its version, sample rate and channel mode.
+	:param frames: int, number of audio frames after the Xing frame.
+	:param size: int, size in bytes of the Xing frame and the audio frames.
+	:return: bytes, the frame.
+	"""
+	offset = xing_offset(parse_mpeg_header(reference))
+	frame = bytearray(empty_mpeg_frame(reference, offset + 16))
+	# Flags 3: the frame count and byte count fields are present
+	frame[offset:offset + 16] = struct.pack('>4sIII', b'Xing', 3, frames, size)
+	return bytes(frame)
+
+
+class ADTSHeader(NamedTuple):
+	sample_rate: int
+	channels: int
+	header_length: int
+	frame_length: int
+	samples: int
+
+	@property
+	def duration(self):
+		return self.samples / self.sample_rate
+
+
+def parse_adts_header(data, offset=0):
+	"""
+	:param data: bytes, buffer holding at least 7 bytes at offset.
+	:return: ADTSHeader, or None if the bytes at offset are not a valid ADTS header.
+	"""
+	if len(data) < offset + 7 or data[offset] != 0xFF or data[offset + 1] & 0xF6 != 0xF0:
+		return None
+	b1, b2, b3, b4, b5, b6 = data[offset + 1:offset + 7]
+	sample_rate_index = (b2 >> 2) & 0xF
+	if sample_rate_index >= len(ADTS_SAMPLE_RATES):
+		return None
+	frame_length = ((b3 & 3) << 11) | (b4 << 3) | (b5 >> 5)
+	header_length = 7 if b1 & 1 else 9
+	if frame_length < header_length:
+		return None
+	channels = ((b2 & 1) << 2) | (b3 >> 6)
+	return ADTSHeader(ADTS_SAMPLE_RATES[sample_rate_index], channels, header_length, frame_length, ((b6 & 3) + 1) * 1024)
+
+
+def find_adts_frame(data, offset=0):
+	"""
+	:return: tuple of (offset, ADTSHeader) of the first ADTS frame at or after offset, or (None, None) if there is none.
+	"""
+	while True:
+		offset = data.find(b'\xff', offset)
+		if offset < 0:
+			return None, None
+		header = parse_adts_header(data, offset)
+		if header is not None:
+			return offset, header
+		offset += 1
+
+
+# Silent raw data blocks of AAC: an element (SCE for mono, CPE with two channels for stereo) with no scale factor bands,
+# followed by the END element
+_AAC_SILENT_BLOCKS = {
+	1: (0b000 << 29 | 0b111).to_bytes(4, 'big'),
+	2: (0b001 << 53 | 0b111 << 1).to_bytes(7, 'big'),
+}
+
+
+def empty_adts_frame(reference):
+	"""
+	Build an ADTS frame holding no spectral data, which decodes to silence.
+	:param reference: bytes, the header of an ADTS frame of the stream, for its profile, sample rate and channels.
+	:return: bytes, the frame.
+	"""
+	header = parse_adts_header(reference)
+	if header is None:
+		raise ValueError("Not an ADTS frame header")
+	block = _AAC_SILENT_BLOCKS.get(header.channels)
+	if block is None:
+		raise ValueError(f"Unsupported ADTS channel configuration {header.channels}")
+	length = 7 + len(block)
+	frame_header = bytes((
+		0xFF,
+		reference[1] | 1,  # no CRC
+		reference[2] & 0xFD,
+		(reference[3] & 0xC0) | (length >> 11),
+		(length >> 3) & 0xFF,
+		((length & 7) << 5) | 0x1F,
+		0xFC,  # buffer fullness 0x7FF (variable bitrate), one raw data block
+	))
+	return frame_header + block
+
+
+_OGG_HEADER = struct.Struct('<4sBBqIIIB')
+OGG_CONTINUED = 0x01
+OGG_BOS = 0x02
+OGG_EOS = 0x04
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def ogg_crc(data):
+	"""
+	CRC-32 of an Ogg page (polynomial 0x04C11DB7, not reflected, no initial or final xor).
+	zlib computes the reflected variant, so it is fed bit-reversed bytes and its result is bit-reversed back;
+	the zlib initial and final xor cancel out against the CRC of as many zero bytes.
+	"""
+	reflected = zlib.crc32(data.translate(_BIT_REVERSE)) ^ zlib.crc32(bytes(len(data)))
+	return int(f"{reflected:032b}"[::-1], 2)
+
+
+class OggPageHeader(NamedTuple):
+	header_type: int
+	granule: int
+	serial: int
+	sequence: int
+	crc: int
+	header_length: int
+	body_length: int
+
+	@property
+	def length(self):
+		return self.header_length + self.body_length
+
+
+def parse_ogg_page_header(data, offset=0):
+	"""
+	:param data: bytes, buffer holding an Ogg page at offset.
+	:return: OggPageHeader, or None if there is no complete page header at offset.
+	"""
+	if data[offset:offset + 4] != b'OggS' or len(data) < offset + _OGG_HEADER.size:
+		return None
+	capture, version, header_type, granule, serial, sequence, crc, count = _OGG_HEADER.unpack_from(data, offset)
+	header_length = _OGG_HEADER.size + count
+	if version != 0 or len(data) < offset + header_length:
+		return None
+	body_length = sum(data[offset + _OGG_HEADER.size:offset + header_length])
+	return OggPageHeader(header_type, granule, serial, sequence, crc, header_length, body_length)
+
+
+def ogg_page_crc_ok(page):
+	"""
+	:param page: bytes, a whole Ogg page.
+	:return: bool, True if the CRC stored in the page matches its content.
+	"""
+	return struct.unpack('<I', page[22:26])[0] == ogg_crc(page[:22] + bytes(4) + page[26:])
+
+
+class OggPage:
+	"""One Ogg page. Packets are split in lacing values of at most 255 bytes; a value below 255 ends a packet."""
+
+	def __init__(self, header_type, granule, serial, sequence, lacing, body):
+		self.header_type = header_type
+		self.granule = granule
+		self.serial = serial
+		self.sequence = sequence
+		self.lacing = lacing
+		self.body = body
+
+	@property
+	def packets_completed(self):
+		"""int, number of packets ending on this page."""
+		return sum(1 for value in self.lacing if value < 255)
+
+	def packets(self):
+		"""
+		:return: list of bytes, the packet parts on this page, the last one possibly continued on the next page.
+		"""
+		parts, start, length = [], 0, 0
+		for value in self.lacing:
+			length += value
+			if value < 255:
+				parts.append(self.body[start:start + length])
+				start += length
+				length = 0
+		if length:
+			parts.append(self.body[start:start + length])
+		return parts
+
+	def to_bytes(self):
+		"""Serialize the page, computing its CRC."""
+		header = _OGG_HEADER.pack(b'OggS', 0, self.header_type, self.granule, self.serial, self.sequence, 0, len(self.lacing))
+		page = header + bytes(self.lacing) + self.body
+		return page[:22] + struct.pack('<I', ogg_crc(page)) + page[26:]
+
+	def __len__(self):
+		return _OGG_HEADER.size + len(self.lacing) + len(self.body)
+
+
+def read_ogg_page(f):
+	"""
+	Read the next page from a binary file object.
+	:return: OggPage, or None at end of file. A ValueError is raised if the data is not an Ogg page.
+	"""
+	header = f.read(_OGG_HEADER.size)
+	if not header:
+		return None
+	if len(header) < _OGG_HEADER.size:
+		raise ValueError("Truncated Ogg page header")
+	capture, version, header_type, granule, serial, sequence, crc, count = _OGG_HEADER.unpack(header)
+	if capture != b'OggS' or version != 0:
+		raise ValueError("Not an Ogg page")
+	lacing = f.read(count)
+	body = f.read(sum(lacing))
+	if len(lacing) < count or len(body) < sum(lacing):
+		raise ValueError("Truncated Ogg page")
+	return OggPage(header_type, granule, serial, sequence, lacing, body)
+
+
+def ogg_header_packet_count(first_packet):
+	"""
+	:param first_packet: bytes, the first packet of a logical stream.
+	:return: int, the number of header packets of the codec: 2 for Opus, 3 for Vorbis.
+	"""
+	if first_packet.startswith(b'OpusHead'):
+		return 2
+	if first_packet.startswith(b'\x01vorbis'):
+		return 3
+	raise ValueError("Unsupported Ogg codec")
+
+
+def opus_packet_samples(packet):
+	"""
+	:param packet: bytes, an Opus audio packet, or at least its first 2 bytes.
+	:return: int, number of samples at 48 kHz the packet decodes to, from its TOC byte.
+	"""
+	if not packet:
+		return 0
+	config = packet[0] >> 3
+	if config < 12:
+		frame_samples = (480, 960, 1920, 2880)[config % 4]
+	elif config < 16:
+		frame_samples = (480, 960)[config % 2]
+	else:
+		frame_samples = (120, 240, 480, 960)[config % 4]
+	code = packet[0] & 3
+	if code == 0:
+		frames = 1
+	elif code < 3:
+		frames = 2
+	else:
+		frames = packet[1] & 0x3F if len(packet) > 1 else 0
+	return frame_samples * frames
+
+
+def vorbis_mode_blockflags(setup):
+	"""
+	Find the modes of a Vorbis stream by walking back from the framing bit that ends its setup header,
+	since the codebooks before them cannot be skipped without being decoded.
+	Each mode is a block flag, two 16-bit zero fields and a mapping number below 64, and they follow the mode count.
+	:param setup: bytes, the Vorbis setup header packet.
+	:return: list of bool, for each mode whether it uses long blocks.
+	"""
+	bits = int.from_bytes(setup, 'little')
+	position = bits.bit_length() - 1
+	modes, found = [], None
+	while position >= 41 + 6 and len(modes) < 64:
+		position -= 41
+		mode = bits >> position
+		if (mode >> 1) & 0xFFFFFFFF or (mode >> 33) & 0xFF > 63:
+			break
+		modes.insert(0, bool(mode & 1))
+		if ((bits >> (position - 6)) & 0x3F) + 1 == len(modes):
+			found = list(modes)
+	if found is None:
+		raise ValueError("No Vorbis modes found in the setup header")
+	return found
+
+
+class OggCodec:
+	"""
+	Packet durations of an Opus or Vorbis logical stream, and its silent packet.
+	An Opus packet decodes to a duration given by its TOC byte. A Vorbis packet has a short or long block size
+	given by its mode, and decodes to a quarter of its block plus a quarter of the previous block.
+	"""
+
+	def __init__(self, headers):
+		"""
+		:param headers: list of bytes, the header packets of the stream.
+		"""
+		ident = headers[0]
+		self.opus = ident.startswith(b'OpusHead')
+		if self.opus:
+			self.channels = ident[9]
+			self.sample_rate = 48000
+		else:
+			self.channels = ident[11]
+			self.sample_rate = struct.unpack('<I', ident[12:16])[0]
+			self.block_sizes = (1 << (ident[28] & 0x0F), 1 << (ident[28] >> 4))
+			self.modes = vorbis_mode_blockflags(headers[2])
+			self.mode_bits = (len(self.modes) - 1).bit_length()
+
+	def block(self, packet):
+		"""
+		:param packet: bytes, an audio packet, or at least its first 2 bytes.
+		:return: int, for Opus its number of samples, for Vorbis its block size.
+		"""
+		if self.opus:
+			return opus_packet_samples(packet)
+		mode = (int.from_bytes(packet[:2], 'little') >> 1) & ((1 << self.mode_bits) - 1)
+		return self.block_sizes[self.modes[mode]] if mode < len(self.modes) else 0
+
+	def samples(self, block, previous):
+		"""
+		:param block: int, the value of block for a packet.
+		:param previous: int, the value of block for the previous packet of the stream, or 0 for the first packet.
+		:return: int, number of samples the packet completes.
+		"""
+		if self.opus:
+			return block
+		return (previous + block) // 4 if previous else 0
+
+	def silent_packet(self):
+		"""
+		:return: bytes, an audio packet decoding to silence: for Opus a 20 ms CELT frame with the silence flag,
+		         for Vorbis a packet of mode 0 whose floors are all unused.
+		"""
+		if self.opus:
+			if self.channels > 2:
+				raise ValueError("Silence is not supported for multistream Opus")
+			return b'\xfc\xff\xfe' if self.channels == 2 else b'\xf8\xff\xfe'
+		return bytes(2)
@@ -0,0 +1,154 @@
+import difflib
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from .cache import MemoryCache, cache_key
+from .concat import concat_audio
+from .silence import Pause
+from .text import split_paragraphs, split_text
+from .ttsmaker import TTSError
+
+
+class DocumentRender(NamedTuple):
+	"""Outcome of DocumentSynthesizer.render."""
+	filepath: str
+	segments: int
+	synthesized: int
+	reused: int
+	# difflib opcodes ('replace', 'delete' or 'insert', i1, i2, j1, j2) between the previous and this version's segments
+	changes: list
+
+
+class SegmentSynthesizer:
+	"""
+	Synthesizes short texts for one voice and set of parameters, keeping their audio in a cache,
+	and joins cached segments into audio files.
+	"""
+
+	def __init__(self, client, voice_id, cache=None, max_workers=8, **params):
+		"""
+		:param client: TTSMaker, the client used to synthesize segments.
+		:param voice_id: int, voice ID.
+		:param cache: AudioCache, optional, where segment audio is kept. Default is the client's cache,
+		              or a MemoryCache of 256 MiB if the client has none. Use a DiskCache to keep segments across runs.
+		:param max_workers: int, number of segments synthesized at once. Default is 8.
+		:param params: optional create_tts_order parameters such as audio_format or audio_speed.
+		"""
+		self.client = client
+		self.voice_id = voice_id
+		# Not `cache or ...`: an empty cache has no length, and would be dropped
+		if cache is None:
+			cache = client.cache if client.cache is not None else MemoryCache(256 * 1024 * 1024)
+		self.cache = cache
+		self.max_workers = max_workers
+		self.params = params
+
+	@property
+	def audio_format(self):
+		return self.params.get('audio_format', 'mp3')
+
+	def key(self, segment):
+		"""
+		:param segment: str, segment text.
+		:return: str, the cache key of the segment audio.
+		"""
+		return cache_key(segment, self.voice_id, **self.params)
+
+	def synthesize(self, segment):
+		"""
+		Synthesize one segment and store its audio in the cache.
+		:return: bytes, the audio.
+		"""
+		order = self.client.create_tts_order(segment, self.voice_id, **self.params)
+		data = b''.join(order.stream_audio())
+		self.cache.set(self.key(segment), data, order.audio_file_type)
+		return data
+
+	def prepare(self, segments):
+		"""
+		Synthesize, concurrently, the segments missing from the cache.
+		:param segments: iterable of str.
+		:return: list of str, the segments that were synthesized. If one fails, its TTSError exception is raised.
+		"""
+		missing = list(dict.fromkeys(segment for segment in segments if self.key(segment) not in self.cache))
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			list(executor.map(self.synthesize, missing))
+		return missing
+
+	def audio(self, segment):
+		"""
+		:return: bytes, the audio of segment, synthesized first if it is not cached.
+		"""
+		data = self.cache.get(self.key(segment))
+		return data if data is not None else self.synthesize(segment)
+
+	def join(self, segments, filepath):
+		"""
+		Join the audio of segments, in order, into filepath.
+		:param segments: iterable of str, or Pause for silence between segments.
+		:return: str, filepath.
+		"""
+		sources = (segment if isinstance(segment, Pause) else self.audio(segment) for segment in segments)
+		return concat_audio(sources, filepath, self.audio_format)
+
+
+class DocumentSynthesizer(SegmentSynthesizer):
+	"""
+	Synthesizes successive versions of a document, caching audio per segment.
+	Segments are the chunks of split_paragraph_chunks, so an edit only changes the segments of the edited paragraph,
+	and rendering a new version only creates orders for segments that are not cached yet.
+	"""
+
+	def __init__(self, client, voice_id, cache=None, max_chars=500, max_workers=8, paragraph_pause=None, **params):
+		"""
+		:param max_chars: int, maximum number of characters per segment. Default is 500.
+		:param paragraph_pause: float, optional, seconds of silence inserted between paragraphs when joining,
+		                        without limit on their number. Supported for mp3, aac, ogg and opus.
+		The other parameters are those of SegmentSynthesizer.
+		"""
+		super().__init__(client, voice_id, cache, max_workers, **params)
+		self.max_chars = max_chars
+		self.paragraph_pause = paragraph_pause
+		self.previous = []
+
+	def paragraphs(self, text):
+		"""
+		:param text: str, the document.
+		:return: list of list of str, the segments of each paragraph.
+		"""
+		return [split_text(paragraph, self.max_chars) for paragraph in split_paragraphs(text)]
+
+	def segment(self, text):
+		"""
+		:param text: str, the document.
+		:return: list of str, its segments.
+		"""
+		return [segment for paragraph in self.paragraphs(text) for segment in paragraph]
+
+	def render(self, text, filename):
+		"""
+		Synthesize the segments of text missing from the cache, and join the audio of all segments in order.
+		:param text: str, the new version of the document.
+		:param filename: str, file name without extension; audio_format (default 'mp3') is used as extension.
+		:return: DocumentRender. If a segment fails, its TTSError exception is raised.
+		"""
+		paragraphs = self.paragraphs(text)
+		segments = [segment for paragraph in paragraphs for segment in paragraph]
+		if not segments:
+			raise TTSError("Cannot synthesize empty text")
+		matcher = difflib.SequenceMatcher(None, self.previous, segments, autojunk=False)
+		changes = [opcode for opcode in matcher.get_opcodes() if opcode[0] != 'equal']
+
+		synthesized = self.prepare(segments)
+		if self.paragraph_pause:
+			sources = []
+			for paragraph in paragraphs:
+				if sources:
+					sources.append(Pause(self.paragraph_pause))
+				sources.extend(paragraph)
+		else:
+			sources = segments
+		filepath = self.join(sources, f"{filename}.{self.audio_format}")
+
+		self.previous = segments
+		return DocumentRender(filepath, len(segments), len(synthesized), len(segments) - len(synthesized), changes)
@@ -0,0 +1,182 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+class HedgePolicy:
+	"""
+	Hedged order creation: if a request for a short text has not answered within a delay, a duplicate request is sent
+	and whichever answers first is kept. The delay is a percentile of the recent request latencies, so only the
+	slowest requests are hedged. Each duplicate spends the quota of its text again, so hedges draw on a budget that
+	grows by budget times the characters of every order.
+	"""
+
+	def __init__(self, max_characters=500, percentile=95, initial_delay=1.0, min_delay=0.05, window=200, min_samples=20, budget=0.05, max_workers=32):
+		"""
+		:param max_characters: int, only orders whose text is at most this long are hedged. Default is 500.
+		:param percentile: float, percentile of the recent latencies used as the hedge delay. Default is 95.
+		:param initial_delay: float, seconds of hedge delay until min_samples latencies are known. Default is 1.
+		:param min_delay: float, lower bound in seconds of the hedge delay. Default is 0.05.
+		:param window: int, number of recent latencies the percentile is computed over. Default is 200.
+		:param min_samples: int, number of latencies needed before the percentile is used. Default is 20.
+		:param budget: float, characters that may be spent on duplicates, as a fraction of the characters ordered.
+		               Default is 0.05, at most 5% of extra quota.
+		:param max_workers: int, maximum number of duplicate requests in flight at once. Default is 32.
+		"""
+		self.max_characters = max_characters
+		self.percentile = percentile
+		self.initial_delay = initial_delay
+		self.min_delay = min_delay
+		self.min_samples = min_samples
+		self.budget = budget
+		self.max_workers = max_workers
+		self.orders = 0
+		self.hedged = 0
+		self.hedge_won = 0
+		self.over_budget = 0
+		self.no_worker = 0
+		self.rate_limited = 0
+		self.extra_characters = 0
+		self._latencies = deque(maxlen=window)
+		self._credit = 0.0
+		self._hedges_running = 0
+		self._executor = None
+		self._lock = threading.Lock()
+
+	def delay(self):
+		"""
+		:return: float, seconds to wait for an answer before sending a duplicate request.
+		"""
+		with self._lock:
+			latencies = sorted(self._latencies)
+		if len(latencies) < self.min_samples:
+			return self.initial_delay
+		index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+		return max(self.min_delay, latencies[index])
+
+	def _spend(self, characters, permit):
+		with self._lock:
+			if self._hedges_running >= self.max_workers:
+				self.no_worker += 1
+				return False
+			if self._credit < characters:
+				self.over_budget += 1
+				return False
+			if permit is not None and not permit():
+				self.rate_limited += 1
+				return False
+			self._credit -= characters
+			self._hedges_running += 1
+			self.hedged += 1
+			self.extra_characters += characters
+			return True
+
+	def _timed(self, func):
+		# The latency is measured from the moment the request is actually sent
+		started = time.monotonic()
+		result = func()
+		with self._lock:
+			self._latencies.append(time.monotonic() - started)
+		return result
+
+	def _call(self, func, future, hedge=False):
+		try:
+			result = self._timed(func)
+		except BaseException as e:
+			future.set_exception(e)
+		else:
+			future.set_result(result)
+		finally:
+			if hedge:
+				with self._lock:
+					self._hedges_running -= 1
+
+	def _get_executor(self):
+		with self._lock:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ttsmaker-hedge')
+			return self._executor
+
+	def run(self, func, characters, on_both_succeeded=None, permit=None):
+		"""
+		Call func, and call it a second time concurrently if it has not returned within delay() and the budget allows.
+		When the budget or the max_workers threads sending second calls leave no room for a hedge, func is simply called
+		in the current thread. Otherwise the first call runs on a thread of its own, so it starts at once whatever
+		the number of concurrent orders.
+		:param func: callable taking no argument, sending one request.
+		:param characters: int, length of the order text.
+		:param on_both_succeeded: callable, optional, called with no argument if the request was hedged and both calls
+		                          succeeded, that is when the quota of the text was spent twice.
+		:param permit: callable, optional, called with no argument before sending the second call, which is skipped
+		               if it returns False. Used to take the second request from a rate limiter without waiting.
+		:return: the return value of the first call that succeeds. If both fail, the exception of the first call is raised.
+		"""
+		if characters > self.max_characters:
+			return func()
+		with self._lock:
+			self.orders += 1
+			self._credit = min(self._credit + characters * self.budget, self.max_characters)
+			can_hedge = self._credit >= characters and self._hedges_running < self.max_workers
+		if not can_hedge:
+			return self._timed(func)
+
+		primary = Future()
+		primary.set_running_or_notify_cancel()
+		# Thread.start returns once the thread runs, so the hedge delay is counted from the start of the request
+		threading.Thread(target=self._call, args=(func, primary), name='ttsmaker-hedge-primary', daemon=True).start()
+		done, _ = wait([primary], timeout=self.delay())
+		if done or not self._spend(characters, permit):
+			return primary.result()
+
+		hedge = Future()
+		hedge.set_running_or_notify_cancel()
+		if on_both_succeeded is not None:
+			successes = itertools.count(1)
+
+			def count_success(future):
+				if future.exception() is None and next(successes) == 2:
+					on_both_succeeded()
+
+			primary.add_done_callback(count_success)
+			hedge.add_done_callback(count_success)
+		self._get_executor().submit(self._call, func, hedge, True)
+
+		pending = {primary, hedge}
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED)
+			for future in (primary, hedge):
+				if future in done and future.exception() is None:
+					if future is hedge:
+						with self._lock:
+							self.hedge_won += 1
+					return future.result()
+		return primary.result()
+
+	@property
+	def stats(self):
+		"""
+		:return: dict of the number of orders eligible for hedging, of hedges sent, of hedges that answered first,
+		         of hedges skipped for lack of budget, of a free worker or of room in the rate limits, the extra characters spent
+		         and the current hedge delay.
+		"""
+		delay = self.delay()
+		with self._lock:
+			return {
+				'orders': self.orders,
+				'hedged': self.hedged,
+				'hedge_won': self.hedge_won,
+				'over_budget': self.over_budget,
+				'no_worker': self.no_worker,
+				'rate_limited': self.rate_limited,
+				'extra_characters': self.extra_characters,
+				'delay': delay,
+			}
+
+	def close(self):
+		"""Stop the threads sending hedged requests, once the requests in progress are done."""
+		with self._lock:
+			executor, self._executor = self._executor, None
+		if executor is not None:
+			executor.shutdown(wait=False)
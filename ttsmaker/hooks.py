@@ -0,0 +1,41 @@
+import threading
+
+# Events emitted by TTSMaker, and the keyword arguments their callbacks receive:
+#   request_start: endpoint
+#   request_end: endpoint, status (HTTP status code, or 'error' if no response was received), elapsed (seconds), bytes
+#   retry: endpoint, attempt (number of the retry), error, delay (seconds slept before it)
+#   cache_hit: key
+#   error: endpoint, error
+# endpoint is one of 'get-voice-list', 'create-tts-order', 'get-token-status' and 'download'.
+EVENTS = ('request_start', 'request_end', 'retry', 'cache_hit', 'error')
+
+
+class Hooks:
+	"""
+	Callbacks registered per event. Callbacks run synchronously in the thread that emits the event,
+	and an exception raised by a callback propagates to the caller.
+	"""
+
+	def __init__(self):
+		self._callbacks = {event: () for event in EVENTS}
+		self._lock = threading.Lock()
+
+	def add(self, event, callback):
+		"""
+		:param event: str, one of EVENTS.
+		:param callback: callable, called with the keyword arguments of the event.
+		"""
+		if event not in self._callbacks:
+			raise ValueError(f"Unknown event {event!r}, expected one of {', '.join(EVENTS)}")
+		with self._lock:
+			self._callbacks[event] += (callback,)
+
+	def remove(self, event, callback):
+		with self._lock:
+			callbacks = list(self._callbacks[event])
+			callbacks.remove(callback)
+			self._callbacks[event] = tuple(callbacks)
+
+	def emit(self, event, **fields):
+		for callback in self._callbacks[event]:
+			callback(**fields)
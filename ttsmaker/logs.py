@@ -0,0 +1,79 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('ttsmaker')
+# Silent unless the application configures logging
+logger.addHandler(logging.NullHandler())
+
+
+def log_saved(filepath, size, elapsed):
+	"""
+	Log at DEBUG level that an audio file was saved. The record carries filepath, bytes and elapsed as attributes.
+	:param filepath: str, the path of the saved file.
+	:param size: int, size of the file in bytes.
+	:param elapsed: float, seconds spent downloading and writing the file.
+	"""
+	if logger.isEnabledFor(logging.DEBUG):
+		logger.debug(
+			"Audio file saved as %s (%d bytes, %.3f s)", filepath, size, elapsed,
+			extra={'filepath': filepath, 'bytes': size, 'elapsed': elapsed},
+		)
+
+
+class BatchSummary:
+	"""
+	Running totals of a bulk job, logged at INFO level every interval seconds and once more when the job ends,
+	in place of one log record per file. The records carry saved, failed, bytes and elapsed as attributes.
+	"""
+
+	def __init__(self, interval=10.0, name='batch'):
+		"""
+		:param interval: float, seconds between two summaries. Default is 10.
+		:param name: str, name of the job in the log messages. Default is 'batch'.
+		"""
+		self.interval = interval
+		self.name = name
+		self.saved = 0
+		self.failed = 0
+		self.bytes = 0
+		self.started = time.monotonic()
+		self._logged_at = self.started
+		self._lock = threading.Lock()
+
+	def add(self, filepath=None, error=None):
+		"""
+		Count a finished job, and log a summary if the last one is older than interval.
+		:param filepath: str, the path of the saved file, or None if the job failed.
+		:param error: Exception, optional, the error of a failed job.
+		"""
+		size = os.path.getsize(filepath) if error is None and filepath is not None else 0
+		now = time.monotonic()
+		with self._lock:
+			if error is None:
+				self.saved += 1
+				self.bytes += size
+			else:
+				self.failed += 1
+			due = now - self._logged_at >= self.interval
+			if due:
+				self._logged_at = now
+		if due:
+			self.log()
+
+	def log(self, done=False):
+		if not logger.isEnabledFor(logging.INFO):
+			return
+		with self._lock:
+			saved, failed, size = self.saved, self.failed, self.bytes
+		elapsed = time.monotonic() - self.started
+		logger.info(
+			"%s %s: %d files saved, %d failed, %d bytes in %.1f s",
+			self.name, 'done' if done else 'progress', saved, failed, size, elapsed,
+			extra={'saved': saved, 'failed': failed, 'bytes': size, 'elapsed': elapsed},
+		)
+
+	def close(self):
+		"""Log the final summary."""
+		self.log(done=True)
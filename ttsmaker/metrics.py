@@ -0,0 +1,186 @@
+"""
+Counters and latency histograms of the requests made by TTSMaker clients, in the Prometheus text exposition format.
+"""
+import bisect
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .hooks import EVENTS
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Histogram:
+	def __init__(self, buckets):
+		self.counts = [0] * (len(buckets) + 1)
+		self.sum = 0.0
+
+	def observe(self, buckets, value):
+		self.counts[bisect.bisect_left(buckets, value)] += 1
+		self.sum += value
+
+
+def _labels(**labels):
+	escaped = (
+		(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+		for name, value in labels.items()
+	)
+	return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _number(value):
+	return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+
+class MetricsCollector:
+	"""
+	Collects the events of one or more TTSMaker clients: requests and response bytes per endpoint and status,
+	request latency histograms, requests in flight, retries, errors and cache hits.
+
+		metrics = MetricsCollector()
+		metrics.attach(ttsmaker)
+		metrics.serve(9464)  # or metrics.render()
+	"""
+
+	def __init__(self, buckets=DEFAULT_BUCKETS, prefix='ttsmaker'):
+		"""
+		:param buckets: sequence of float, upper bounds in seconds of the latency histogram buckets.
+		:param prefix: str, prefix of the metric names. Default is 'ttsmaker'.
+		"""
+		self.buckets = tuple(sorted(buckets))
+		self.prefix = prefix
+		self.requests = Counter()
+		self.response_bytes = Counter()
+		self.in_flight = Counter()
+		self.retries = Counter()
+		self.errors = Counter()
+		self.cache_hits = 0
+		self._latency = {}
+		self._lock = threading.Lock()
+		self._httpd = None
+		self._thread = None
+
+	def attach(self, client):
+		"""
+		Register the collector's callbacks on the hooks of client.
+		:param client: TTSMaker.
+		"""
+		for event in EVENTS:
+			client.hooks.add(event, getattr(self, f'_on_{event}'))
+		return self
+
+	def detach(self, client):
+		for event in EVENTS:
+			client.hooks.remove(event, getattr(self, f'_on_{event}'))
+
+	def _on_request_start(self, endpoint):
+		with self._lock:
+			self.in_flight[endpoint] += 1
+
+	def _on_request_end(self, endpoint, status, elapsed, bytes):
+		key = (endpoint, str(status))
+		with self._lock:
+			self.in_flight[endpoint] -= 1
+			self.requests[key] += 1
+			self.response_bytes[endpoint] += bytes
+			histogram = self._latency.get(key)
+			if histogram is None:
+				histogram = self._latency[key] = _Histogram(self.buckets)
+			histogram.observe(self.buckets, elapsed)
+
+	def _on_retry(self, endpoint, attempt, error, delay):
+		with self._lock:
+			self.retries[endpoint] += 1
+
+	def _on_cache_hit(self, key):
+		with self._lock:
+			self.cache_hits += 1
+
+	def _on_error(self, endpoint, error):
+		with self._lock:
+			self.errors[(endpoint, type(error).__name__)] += 1
+
+	def render(self):
+		"""
+		:return: str, the metrics in the Prometheus text exposition format.
+		"""
+		p = self.prefix
+		lines = []
+
+		def family(name, kind, description, samples):
+			lines.append(f"# HELP {p}_{name} {description}")
+			lines.append(f"# TYPE {p}_{name} {kind}")
+			lines.extend(samples)
+
+		with self._lock:
+			family('requests_total', 'counter', "HTTP requests by endpoint and status.", [
+				f"{p}_requests_total{_labels(endpoint=endpoint, status=status)} {count}"
+				for (endpoint, status), count in sorted(self.requests.items())
+			])
+			samples = []
+			for (endpoint, status), histogram in sorted(self._latency.items()):
+				cumulative = 0
+				for bound, count in zip(self.buckets + ('+Inf',), histogram.counts):
+					cumulative += count
+					le = bound if bound == '+Inf' else _number(float(bound))
+					samples.append(f"{p}_request_duration_seconds_bucket{_labels(endpoint=endpoint, status=status, le=le)} {cumulative}")
+				samples.append(f"{p}_request_duration_seconds_sum{_labels(endpoint=endpoint, status=status)} {_number(histogram.sum)}")
+				samples.append(f"{p}_request_duration_seconds_count{_labels(endpoint=endpoint, status=status)} {cumulative}")
+			family('request_duration_seconds', 'histogram', "Duration of HTTP requests, response body included.", samples)
+			family('response_bytes_total', 'counter', "Bytes of response bodies by endpoint.", [
+				f"{p}_response_bytes_total{_labels(endpoint=endpoint)} {count}" for endpoint, count in sorted(self.response_bytes.items())
+			])
+			family('requests_in_flight', 'gauge', "HTTP requests in progress by endpoint.", [
+				f"{p}_requests_in_flight{_labels(endpoint=endpoint)} {count}" for endpoint, count in sorted(self.in_flight.items())
+			])
+			family('retries_total', 'counter', "Retries by endpoint.", [
+				f"{p}_retries_total{_labels(endpoint=endpoint)} {count}" for endpoint, count in sorted(self.retries.items())
+			])
+			family('errors_total', 'counter', "Failed requests by endpoint and error type.", [
+				f"{p}_errors_total{_labels(endpoint=endpoint, error=error)} {count}" for (endpoint, error), count in sorted(self.errors.items())
+			])
+			family('cache_hits_total', 'counter', "Orders served from the audio cache.", [f"{p}_cache_hits_total {self.cache_hits}"])
+		return '\n'.join(lines) + '\n'
+
+	def serve(self, port=9464, host='127.0.0.1'):
+		"""
+		Serve the metrics over HTTP from a background thread, for a Prometheus server to scrape.
+		:param port: int, port to listen on. Default is 9464, 0 picks a free port.
+		:param host: str, interface to listen on. Default is '127.0.0.1'.
+		:return: str, the URL the metrics are served at.
+		"""
+		if self._httpd is None:
+			collector = self
+
+			class Handler(BaseHTTPRequestHandler):
+				def log_message(self, format, *args):
+					pass
+
+				def do_GET(self):
+					body = collector.render().encode('utf-8')
+					self.send_response(200)
+					self.send_header('Content-Type', CONTENT_TYPE)
+					self.send_header('Content-Length', str(len(body)))
+					self.end_headers()
+					self.wfile.write(body)
+
+			self._httpd = _HTTPServer((host, port), Handler)
+			self._thread = threading.Thread(target=self._httpd.serve_forever, name='ttsmaker-metrics', daemon=True)
+			self._thread.start()
+		host, port = self._httpd.server_address[:2]
+		return f"http://{host}:{port}/metrics"
+
+	def close(self):
+		"""Stop serving the metrics."""
+		if self._httpd is not None:
+			self._httpd.shutdown()
+			self._thread.join()
+			self._httpd.server_close()
+			self._httpd = None
+			self._thread = None
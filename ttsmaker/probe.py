@@ -0,0 +1,327 @@
+"""
+Duration, bitrate and integrity of audio files from their container headers, without decoding.
+Files are memory-mapped and only the headers are read: the MPEG or ADTS frame headers, or the Ogg page headers.
+"""
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from .containers import (
+	ID3V2_HEADER_SIZE,
+	OGG_BOS,
+	OGG_EOS,
+	TRAILING_TAGS_SCAN,
+	find_adts_frame,
+	find_mpeg_frame,
+	id3v2_size,
+	is_vbr_info_frame,
+	ogg_page_crc_ok,
+	parse_adts_header,
+	parse_mpeg_header,
+	parse_ogg_page_header,
+	trailing_tags_size,
+	vbr_info_counts,
+)
+
+# Bytes searched for the first frame after the tags, and for the last Ogg page from the end of the file
+_SCAN_BYTES = 64 * 1024
+_MAX_OGG_PAGE = 27 + 255 + 255 * 255
+
+
+class AudioInfo(NamedTuple):
+	"""Outcome of probe_audio."""
+	audio_format: str
+	# Seconds of audio, and average bitrate in bits per second of the audio frames or pages
+	duration: float
+	bitrate: float
+	sample_rate: int
+	channels: int
+	# Size of the file in bytes
+	size: int
+	# Descriptions of the problems found, such as truncated frames or pages, empty when the file is sound
+	problems: tuple
+
+	@property
+	def ok(self):
+		return not self.problems
+
+
+@contextmanager
+def _mapped(source):
+	if isinstance(source, (bytes, bytearray)):
+		yield source
+	elif isinstance(source, memoryview):
+		yield source.tobytes()
+	elif hasattr(source, 'read'):
+		yield source.read()
+	else:
+		with open(source, 'rb') as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				yield b''
+				return
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+				yield data
+
+
+def _sniff(data):
+	if data[:4] == b'OggS':
+		return 'opus' if data[28:36] == b'OpusHead' else 'ogg'
+	start = id3v2_size(data[:ID3V2_HEADER_SIZE])
+	head = data[start:start + _SCAN_BYTES]
+	mpeg, _ = find_mpeg_frame(head)
+	adts, _ = find_adts_frame(head)
+	if adts is not None and (mpeg is None or adts <= mpeg):
+		return 'aac'
+	return 'mp3' if mpeg is not None else None
+
+
+def _audio_range(data):
+	"""
+	:return: tuple of (offset after the ID3v2 tag, offset of the ID3v1 and APE tags ending the data).
+	"""
+	size = len(data)
+	start = id3v2_size(data[:ID3V2_HEADER_SIZE])
+	end = size - trailing_tags_size(data[max(0, size - TRAILING_TAGS_SCAN):])
+	return start, max(start, end)
+
+
+def _walk_frames(data, offset, end, parse_header, problems):
+	"""
+	Walk frame headers from offset to end, skipping unknown bytes between frames.
+	:return: tuple of (number of frames, number of samples, offset after the last frame).
+	"""
+	frames = samples = skipped = 0
+	last = offset
+	while offset + 4 <= end:
+		header = parse_header(data, offset)
+		if header is None:
+			sync = data.find(b'\xff', offset + 1, end)
+			offset = end if sync < 0 else sync
+			continue
+		if offset + header.frame_length > end:
+			problems.append(f"Truncated frame at byte {offset}")
+			break
+		skipped += offset - last
+		frames += 1
+		samples += header.samples
+		offset += header.frame_length
+		last = offset
+	if skipped:
+		problems.append(f"{skipped} bytes of unknown data between frames")
+	return frames, samples, last
+
+
+def _probe_mpeg(data, full):
+	problems = []
+	start, end = _audio_range(data)
+	offset, header = find_mpeg_frame(data[start:start + _SCAN_BYTES])
+	if header is None:
+		return AudioInfo('mp3', 0.0, None, None, None, len(data), ("No MPEG audio frame",))
+	if offset:
+		problems.append(f"{offset} bytes of unknown data before the first frame")
+	offset += start
+	frame = data[offset:offset + header.frame_length]
+	try:
+		counts = vbr_info_counts(frame, header)
+	except ValueError as e:
+		problems.append(str(e))
+		counts = None
+	audio_start = offset
+	if is_vbr_info_frame(frame, header):
+		audio_start += header.frame_length
+
+	announced_frames, announced_size = counts or (None, None)
+	if announced_frames and not full:
+		# The Xing, Info or VBRI tag gives the length without walking the frames
+		samples = announced_frames * header.samples
+		if announced_size and end - offset < announced_size:
+			problems.append(f"Truncated: {end - offset} bytes of frames, {announced_size} announced")
+		last = end
+	else:
+		frames, samples, last = _walk_frames(data, audio_start, end, parse_mpeg_header, problems)
+		if announced_frames and frames != announced_frames:
+			problems.append(f"{frames} frames, {announced_frames} announced")
+		if not frames:
+			problems.append("No MPEG audio frame")
+	duration = samples / header.sample_rate
+	bitrate = (last - audio_start) * 8 / duration if duration else None
+	return AudioInfo('mp3', duration, bitrate, header.sample_rate, header.channels, len(data), tuple(problems))
+
+
+def _probe_adts(data, full):
+	problems = []
+	start, end = _audio_range(data)
+	offset, header = find_adts_frame(data[start:start + _SCAN_BYTES])
+	if header is None:
+		return AudioInfo('aac', 0.0, None, None, None, len(data), ("No ADTS frame",))
+	if offset:
+		problems.append(f"{offset} bytes of unknown data before the first frame")
+	offset += start
+	frames, samples, last = _walk_frames(data, offset, end, parse_adts_header, problems)
+	duration = samples / header.sample_rate
+	bitrate = (last - offset) * 8 / duration if duration else None
+	return AudioInfo('aac', duration, bitrate, header.sample_rate, header.channels, len(data), tuple(problems))
+
+
+class _OggStreamInfo:
+	def __init__(self, ident):
+		self.opus = ident.startswith(b'OpusHead')
+		if self.opus:
+			self.channels = ident[9]
+			self.sample_rate = 48000
+			self.pre_skip = struct.unpack('<H', ident[10:12])[0]
+		elif ident.startswith(b'\x01vorbis'):
+			self.channels = ident[11]
+			self.sample_rate = struct.unpack('<I', ident[12:16])[0]
+			self.pre_skip = 0
+		else:
+			raise ValueError("Unsupported Ogg codec")
+		self.granule = 0
+		self.sequence = -1
+		self.ended = False
+
+	@property
+	def duration(self):
+		return max(0, self.granule - self.pre_skip) / self.sample_rate
+
+
+def _first_packet(data, offset, page):
+	length = 0
+	for value in data[offset + 27:offset + page.header_length]:
+		length += value
+		if value < 255:
+			break
+	start = offset + page.header_length
+	return data[start:start + length]
+
+
+def _probe_ogg(data, full):
+	size = len(data)
+	page = parse_ogg_page_header(data, 0)
+	if page is None or not page.header_type & OGG_BOS:
+		return AudioInfo('ogg', 0.0, None, None, None, size, ("No Ogg stream",))
+	first = _OggStreamInfo(_first_packet(data, 0, page))
+	audio_format = 'opus' if first.opus else 'ogg'
+	problems = []
+
+	if not full:
+		# Only the last page is read: its granule position gives the length of the stream
+		offset = data.rfind(b'OggS', max(0, size - _MAX_OGG_PAGE))
+		while offset >= 0:
+			last = parse_ogg_page_header(data, offset)
+			if last is not None and last.serial == page.serial:
+				if offset + last.length > size:
+					problems.append(f"Truncated page at byte {offset}")
+				elif not ogg_page_crc_ok(data[offset:offset + last.length]):
+					problems.append(f"Bad CRC in page at byte {offset}")
+				elif offset + last.length < size:
+					problems.append(f"{size - offset - last.length} bytes of unknown data after the last page")
+				if not last.header_type & OGG_EOS:
+					problems.append("The stream has no end page")
+				first.granule = last.granule
+				break
+			if last is not None:
+				# Chained streams: every page has to be read
+				return _probe_ogg(data, True)
+			offset = data.rfind(b'OggS', max(0, offset - _MAX_OGG_PAGE), offset)
+		else:
+			problems.append("The stream has no end page")
+		streams = [first]
+	else:
+		streams, by_serial = [], {}
+		offset = 0
+		while offset < size:
+			page = parse_ogg_page_header(data, offset)
+			if page is None:
+				sync = data.find(b'OggS', offset + 1)
+				following = size if sync < 0 else sync
+				problems.append(f"{following - offset} bytes of unknown data at byte {offset}")
+				offset = following
+				continue
+			if offset + page.length > size:
+				problems.append(f"Truncated page at byte {offset}")
+				break
+			if not ogg_page_crc_ok(data[offset:offset + page.length]):
+				problems.append(f"Bad CRC in page at byte {offset}")
+			stream = by_serial.get(page.serial)
+			if page.header_type & OGG_BOS:
+				try:
+					stream = _OggStreamInfo(_first_packet(data, offset, page))
+				except ValueError:
+					stream = None
+				if stream is not None:
+					streams.append(stream)
+					by_serial[page.serial] = stream
+			if stream is None:
+				problems.append(f"Page of unknown stream {page.serial} at byte {offset}")
+			else:
+				if page.sequence != stream.sequence + 1:
+					problems.append(f"Missing pages before byte {offset}")
+				stream.sequence = page.sequence
+				if page.granule != -1:
+					stream.granule = page.granule
+				stream.ended = stream.ended or bool(page.header_type & OGG_EOS)
+			offset += page.length
+		for stream in streams:
+			if not stream.ended:
+				problems.append("The stream has no end page")
+
+	duration = sum(stream.duration for stream in streams)
+	bitrate = size * 8 / duration if duration else None
+	return AudioInfo(audio_format, duration, bitrate, first.sample_rate, first.channels, size, tuple(problems))
+
+
+_PROBES = {'mp3': _probe_mpeg, 'aac': _probe_adts, 'ogg': _probe_ogg, 'opus': _probe_ogg}
+
+
+def probe_audio(source, audio_format=None, full=False):
+	"""
+	Find the duration, bitrate and integrity of an mp3, aac, ogg or opus file, without decoding it.
+
+	- mp3: the duration comes from the Xing, Info or VBRI tag when there is one, otherwise from the frame headers.
+	- aac: the duration comes from the ADTS frame headers.
+	- ogg, opus: the duration comes from the granule position of the last page.
+
+	Problems found are listed in AudioInfo.problems: truncated frames or pages, unknown data, missing end of stream,
+	bad page CRCs, or frame counts that do not match the Xing tag.
+
+	:param source: str file path, bytes or binary file object. A path is memory-mapped, so only the pages
+	               holding the headers read are loaded.
+	:param audio_format: str, optional, the audio file type. Default is None, which uses the extension of a path
+	                     and otherwise guesses it from the data.
+	:param full: bool, if True every frame or page header is checked, and every Ogg page CRC. Default is False,
+	             which reads only the tag of an mp3 file with one, or the first and last pages of an Ogg file.
+	:return: AudioInfo. A ValueError is raised if the format is not supported or cannot be recognized.
+	"""
+	if audio_format is None and isinstance(source, (str, os.PathLike)):
+		extension = os.path.splitext(source)[1].lstrip('.').lower()
+		audio_format = extension if extension in _PROBES else None
+	with _mapped(source) as data:
+		audio_format = (audio_format or _sniff(data) or '').lower()
+		if audio_format not in _PROBES:
+			raise ValueError(f"Cannot probe audio format {audio_format or 'of unknown data'}")
+		return _PROBES[audio_format](data, full)
+
+
+def probe_directory(directory, full=False):
+	"""
+	Probe every mp3, aac, ogg and opus file under directory, recursively.
+	:param directory: str, the directory to sweep.
+	:param full: bool, see probe_audio.
+	:return: generator of tuples of (path, AudioInfo). A file that cannot be read or probed, such as an Ogg
+	         file of an unsupported codec, gets an AudioInfo whose problems hold the error.
+	"""
+	for root, dirs, files in os.walk(directory):
+		dirs.sort()
+		for name in sorted(files):
+			extension = os.path.splitext(name)[1].lstrip('.').lower()
+			if extension in _PROBES:
+				path = os.path.join(root, name)
+				try:
+					info = probe_audio(path, extension, full)
+				except (OSError, ValueError, struct.error) as e:
+					# One unreadable file must not end the sweep
+					info = AudioInfo(extension, 0.0, None, None, None, None, (f"Cannot probe: {e}",))
+				yield path, info
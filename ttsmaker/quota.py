@@ -0,0 +1,147 @@
+import threading
+import time
+
+from .singleflight import SingleFlight
+from .ttsmaker import QuotaExhaustedError
+
+
+def available_characters(token_status):
+	"""
+	:param token_status: dict, the JSON response of get-token-status.
+	:return: int, characters left in the current cycle, or None if the response does not tell.
+	"""
+	status = token_status.get('token_status') or {}
+	available = status.get('current_cycle_characters_available')
+	if available is None and status.get('current_cycle_max_characters') is not None:
+		available = status['current_cycle_max_characters'] - status.get('current_cycle_characters_used', 0)
+	return None if available is None else max(0, int(available))
+
+
+class QuotaTracker:
+	"""
+	Local account of the characters left to a token, so that callers do not poll get_token_status.
+	The quota is synced from get_token_status every sync_interval seconds, concurrent callers sharing a single fetch,
+	and the text length of every successful order is subtracted in between. Orders are reserved before being sent,
+	so concurrent orders cannot together overrun the quota.
+	"""
+
+	def __init__(self, client, token=None, sync_interval=600, singleflight=None):
+		"""
+		:param client: TTSMaker, the client used to fetch the token status.
+		:param token: str, optional, the token to track. Default is None, which tracks the client's token.
+		:param sync_interval: float, seconds between two syncs with get_token_status. Default is 600.
+		:param singleflight: SingleFlight, optional, coalesces concurrent fetches. Default is a new SingleFlight.
+		"""
+		self.client = client
+		self.token = token or client.token
+		self.sync_interval = sync_interval
+		self.singleflight = singleflight or SingleFlight()
+		self.synced_at = None
+		self.syncs = 0
+		# Characters available at the last sync, or None if unknown
+		self.available = None
+		# Characters of successful and of in-flight orders since the last sync
+		self.used = 0
+		self.pending = 0
+		self.exhausted = False
+		self._lock = threading.Lock()
+
+	@property
+	def is_fresh(self):
+		return self.synced_at is not None and time.monotonic() - self.synced_at < self.sync_interval
+
+	@property
+	def remaining(self):
+		"""int, characters left to the token according to the local account, or None if unknown."""
+		self.sync()
+		with self._lock:
+			return self._remaining()
+
+	def _remaining(self):
+		if self.available is None:
+			return None
+		return self.available - self.used - self.pending
+
+	def _fetch(self):
+		try:
+			available = available_characters(self.client.get_token_status(self.token))
+		finally:
+			# A failed fetch is not retried before the next interval either, so that orders do not poll a failing endpoint
+			with self._lock:
+				self.synced_at = time.monotonic()
+		with self._lock:
+			if available is not None:
+				self.available = available
+				self.used = 0
+				self.exhausted = available <= 0
+			self.syncs += 1
+
+	def sync(self, force=False):
+		"""
+		Fetch the token status if the last sync is older than sync_interval. Concurrent callers share one fetch.
+		If the fetch fails, the previous account is kept, no error is raised, and the next fetch waits for sync_interval.
+		:param force: bool, sync even if the last sync is recent. Default is False.
+		"""
+		if self.is_fresh and not force:
+			return
+		try:
+			self.singleflight.do('token-status', self.token, self._fetch)
+		except Exception:
+			pass
+
+	def fits(self, characters):
+		"""
+		:param characters: int, number of characters.
+		:return: bool, False if the token is known not to have that many characters left.
+		"""
+		remaining = self.remaining
+		return not self.exhausted and (remaining is None or remaining >= characters)
+
+	def reserve(self, characters):
+		"""
+		Count the characters of an order about to be sent as in flight.
+		A QuotaExhaustedError exception is raised, and nothing is reserved, if the order would overrun the quota.
+		:param characters: int, length of the order text.
+		"""
+		self.sync()
+		with self._lock:
+			remaining = self._remaining()
+			if self.exhausted or (remaining is not None and remaining < characters):
+				raise QuotaExhaustedError(f"Token has {remaining or 0} characters left, {characters} needed")
+			self.pending += characters
+
+	def commit(self, characters):
+		"""Count the characters of a reserved order that succeeded."""
+		with self._lock:
+			self.pending -= characters
+			self.used += characters
+
+	def charge(self, characters):
+		"""Count characters spent without a reservation, such as by the duplicate of a hedged order."""
+		with self._lock:
+			self.used += characters
+
+	def release(self, characters):
+		"""Give back the characters of a reserved order that failed."""
+		with self._lock:
+			self.pending -= characters
+
+	def mark_exhausted(self, characters=0):
+		"""
+		Record that the token reported quota exhaustion, until the next sync shows quota again.
+		:param characters: int, characters of the reserved order that failed, given back.
+		"""
+		with self._lock:
+			self.pending -= characters
+			self.exhausted = True
+			if self.available is not None:
+				self.available = self.used + self.pending
+
+	@property
+	def stats(self):
+		"""
+		:return: dict of the remaining quota (None if unknown), characters used since the last sync,
+		         characters in flight, whether the token is exhausted, and the number of syncs.
+		"""
+		with self._lock:
+			return {'remaining': self._remaining(), 'used': self.used, 'pending': self.pending, 'exhausted': self.exhausted, 'syncs': self.syncs}
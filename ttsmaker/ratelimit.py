@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket. Tokens are reserved up front, possibly driving the balance negative,
+	and the caller then waits until the reservation is covered. Callers are therefore served in the order
+	they asked, and the same bucket can pace threads and asyncio tasks at once.
+	"""
+
+	def __init__(self, rate, capacity=None):
+		"""
+		:param rate: float, tokens added per second.
+		:param capacity: float, maximum number of tokens, i.e. the allowed burst. Default is None, which uses rate.
+		"""
+		if rate <= 0:
+			raise ValueError("rate must be positive")
+		self.rate = rate
+		self.capacity = capacity or rate
+		self._tokens = self.capacity
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def reserve(self, amount=1):
+		"""
+		Take amount tokens from the bucket.
+		:param amount: float, number of tokens.
+		:return: float, number of seconds the caller must wait before proceeding.
+		"""
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			self._tokens -= amount
+			return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+	def try_acquire(self, amount=1):
+		"""
+		Take amount tokens only if they are available now.
+		:return: bool, True if the tokens were taken.
+		"""
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			if self._tokens < amount:
+				return False
+			self._tokens -= amount
+			return True
+
+	def refund(self, amount=1):
+		"""Give back amount tokens taken for a request that was not sent."""
+		with self._lock:
+			self._tokens = min(self.capacity, self._tokens + amount)
+
+	def acquire(self, amount=1):
+		"""Take amount tokens, sleeping the current thread until they are available."""
+		delay = self.reserve(amount)
+		if delay > 0:
+			time.sleep(delay)
+
+	async def acquire_async(self, amount=1):
+		"""Take amount tokens, sleeping the current task until they are available."""
+		delay = self.reserve(amount)
+		if delay > 0:
+			await asyncio.sleep(delay)
+
+
+class RateLimiter:
+	"""Client-side limits on order creation: requests per second and synthesized characters per minute."""
+
+	def __init__(self, requests_per_second=None, characters_per_minute=None, request_burst=None, character_burst=None):
+		"""
+		:param requests_per_second: float, optional, maximum sustained number of create_tts_order requests per second.
+		:param characters_per_minute: float, optional, maximum sustained number of text characters sent per minute.
+		:param request_burst: float, optional, number of requests allowed at once. Default is requests_per_second.
+		:param character_burst: float, optional, number of characters allowed at once. Default is characters_per_minute.
+		"""
+		self.requests = TokenBucket(requests_per_second, request_burst) if requests_per_second else None
+		self.characters = TokenBucket(characters_per_minute / 60, character_burst or characters_per_minute) if characters_per_minute else None
+
+	def _delay(self, characters):
+		delay = 0.0
+		if self.requests is not None:
+			delay = self.requests.reserve(1)
+		if self.characters is not None and characters:
+			delay = max(delay, self.characters.reserve(characters))
+		return delay
+
+	def try_acquire(self, characters=0):
+		"""
+		Take one request of the given size from the limits only if it fits now, without waiting.
+		:param characters: int, number of text characters of the request.
+		:return: bool, True if the request may be sent.
+		"""
+		if self.requests is not None and not self.requests.try_acquire(1):
+			return False
+		if self.characters is not None and characters and not self.characters.try_acquire(characters):
+			if self.requests is not None:
+				self.requests.refund(1)
+			return False
+		return True
+
+	def acquire(self, characters=0):
+		"""
+		Wait, in the current thread, until one request of the given size fits in the limits.
+		:param characters: int, number of text characters of the request.
+		"""
+		delay = self._delay(characters)
+		if delay > 0:
+			time.sleep(delay)
+
+	async def acquire_async(self, characters=0):
+		"""
+		Wait, in the current task, until one request of the given size fits in the limits.
+		:param characters: int, number of text characters of the request.
+		"""
+		delay = self._delay(characters)
+		if delay > 0:
+			await asyncio.sleep(delay)
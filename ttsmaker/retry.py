@@ -0,0 +1,86 @@
+import asyncio
+import random
+import time
+
+import requests
+
+from .ttsmaker import TransientTTSError
+
+
+class RetryPolicy:
+	"""
+	Retry with exponential backoff and jitter.
+	The delay before retry n (starting at 0) is drawn uniformly from [0, min(max_delay, base_delay * multiplier ** n)],
+	or is exactly that bound if jitter is disabled.
+	"""
+
+	def __init__(self, max_attempts=3, base_delay=0.5, max_delay=30.0, multiplier=2.0, jitter=True, retry_on=(TransientTTSError, requests.RequestException, TimeoutError)):
+		"""
+		:param max_attempts: int, total number of attempts including the first one. Default is 3.
+		:param base_delay: float, delay bound in seconds before the first retry. Default is 0.5.
+		:param max_delay: float, upper bound in seconds of any delay. Default is 30.
+		:param multiplier: float, growth factor of the delay bound between retries. Default is 2.
+		:param jitter: bool, draw delays at random below the bound. Default is True.
+		:param retry_on: tuple of exception classes considered transient. Other exceptions are raised immediately.
+		"""
+		self.max_attempts = max(1, max_attempts)
+		self.base_delay = base_delay
+		self.max_delay = max_delay
+		self.multiplier = multiplier
+		self.jitter = jitter
+		self.retry_on = retry_on
+
+	def backoff(self, retry):
+		"""
+		:param retry: int, number of retries already made.
+		:return: float, seconds to wait before the next attempt.
+		"""
+		bound = min(self.max_delay, self.base_delay * self.multiplier ** retry)
+		return random.uniform(0, bound) if self.jitter else bound
+
+	def _next_delay(self, retry, error, on_retry):
+		if retry + 1 >= self.max_attempts or not isinstance(error, self.retry_on):
+			return None
+		delay = self.backoff(retry)
+		if on_retry is not None:
+			on_retry(retry + 1, error, delay)
+		return delay
+
+	def run(self, func, on_retry=None):
+		"""
+		Call func until it succeeds, raises a non-transient exception or max_attempts is reached.
+		:param func: callable taking no argument.
+		:param on_retry: callable, optional, called as on_retry(retry_number, error, delay) before each retry.
+		:return: the return value of func. The last exception is raised if every attempt failed.
+		"""
+		retry = 0
+		while True:
+			try:
+				return func()
+			except Exception as e:
+				delay = self._next_delay(retry, e, on_retry)
+				if delay is None:
+					raise
+			time.sleep(delay)
+			retry += 1
+
+	async def run_async(self, func, on_retry=None):
+		"""
+		Await func() until it succeeds, raises a non-transient exception or max_attempts is reached.
+		:param func: callable taking no argument and returning an awaitable.
+		:param on_retry: callable, optional, called as on_retry(retry_number, error, delay) before each retry.
+		:return: the result of func. The last exception is raised if every attempt failed.
+		"""
+		retry = 0
+		while True:
+			try:
+				return await func()
+			except Exception as e:
+				delay = self._next_delay(retry, e, on_retry)
+				if delay is None:
+					raise
+			await asyncio.sleep(delay)
+			retry += 1
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
@@ -0,0 +1,51 @@
+"""
+Silence encoded in the format of the segments being joined, for the pauses of concat_audio.
+Silent frames carry no audio data, so they are built from the headers of the segments without any encoder,
+and are kept per format and duration.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+from .containers import empty_adts_frame, empty_mpeg_frame, parse_adts_header, parse_mpeg_header
+
+
+class Pause(NamedTuple):
+	"""A pause of the given number of seconds, to place between the sources of concat_audio."""
+	seconds: float
+
+
+@lru_cache(maxsize=256)
+def mpeg_silence(reference, seconds):
+	"""
+	:param reference: bytes, the 4-byte header of a Layer III frame of the stream.
+	:param seconds: float, duration of the silence, rounded to whole frames.
+	:return: tuple of (bytes, number of frames).
+	"""
+	header = parse_mpeg_header(reference)
+	frames = round(seconds * header.sample_rate / header.samples)
+	return empty_mpeg_frame(reference) * frames, frames
+
+
+@lru_cache(maxsize=256)
+def adts_silence(reference, seconds):
+	"""
+	:param reference: bytes, the 7-byte header of an ADTS frame of the stream.
+	:param seconds: float, duration of the silence, rounded to whole frames.
+	:return: bytes, the ADTS frames.
+	"""
+	header = parse_adts_header(reference)
+	return empty_adts_frame(reference) * round(seconds * header.sample_rate / 1024)
+
+
+def ogg_silence(codec, seconds):
+	"""
+	:param codec: OggCodec, of the stream.
+	:param seconds: float, duration of the silence, rounded to whole packets.
+	:return: list of bytes, the silent packets.
+	"""
+	packet = codec.silent_packet()
+	samples = codec.block(packet)
+	if not codec.opus:
+		# Consecutive Vorbis blocks of the same size overlap by half
+		samples //= 2
+	return [packet] * round(seconds * codec.sample_rate / samples)
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from collections import Counter
+
+
+class _Call:
+	def __init__(self):
+		self.event = threading.Event()
+		self.result = None
+		self.error = None
+
+
+class SingleFlight:
+	"""
+	Coalesces concurrent calls with the same key: the first caller runs the function, and callers arriving while it runs
+	wait for it and share its result or exception. Keys are grouped by kind, for example 'order' or 'download',
+	and per-kind counts of calls and deduplicated calls are kept.
+	"""
+
+	def __init__(self):
+		self.calls = Counter()
+		self.deduplicated = Counter()
+		self._calls = {}
+		self._lock = threading.Lock()
+
+	def do(self, kind, key, func):
+		"""
+		:param kind: str, the kind of call, used for the statistics.
+		:param key: hashable, calls with the same kind and key are coalesced.
+		:param func: callable taking no argument.
+		:return: tuple of (result, shared), shared being True if the result came from another caller's call.
+		"""
+		with self._lock:
+			self.calls[kind] += 1
+			call = self._calls.get((kind, key))
+			leader = call is None
+			if leader:
+				call = self._calls[(kind, key)] = _Call()
+			else:
+				self.deduplicated[kind] += 1
+
+		if not leader:
+			call.event.wait()
+			if call.error is not None:
+				raise call.error
+			return call.result, True
+
+		try:
+			call.result = func()
+		except BaseException as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				del self._calls[(kind, key)]
+			call.event.set()
+		return call.result, False
+
+	@property
+	def stats(self):
+		"""dict, for each kind, the number of calls and how many of them were deduplicated."""
+		with self._lock:
+			return {kind: {'calls': self.calls[kind], 'deduplicated': self.deduplicated[kind]} for kind in self.calls}
+
+
+class _AsyncCall:
+	def __init__(self, task):
+		self.task = task
+		self.waiters = 0
+
+
+class AsyncSingleFlight(SingleFlight):
+	"""
+	SingleFlight for coroutines. It must only be used from one event loop.
+	The function runs as a task of its own that every caller awaits, so cancelling one caller does not cancel
+	the others. The task is cancelled once all of its callers have been.
+	"""
+
+	def _forget(self, kind, key, call):
+		if self._calls.get((kind, key)) is call:
+			del self._calls[(kind, key)]
+		if not call.task.cancelled():
+			# Mark the exception as retrieved, there may be no caller left waiting for it
+			call.task.exception()
+
+	async def do(self, kind, key, func):
+		"""
+		:param kind: str, the kind of call, used for the statistics.
+		:param key: hashable, calls with the same kind and key are coalesced.
+		:param func: callable taking no argument and returning an awaitable.
+		:return: tuple of (result, shared), shared being True if the result came from another caller's call.
+		"""
+		self.calls[kind] += 1
+		call = self._calls.get((kind, key))
+		shared = call is not None
+		if shared:
+			self.deduplicated[kind] += 1
+		else:
+			call = self._calls[(kind, key)] = _AsyncCall(asyncio.ensure_future(func()))
+			call.task.add_done_callback(lambda task: self._forget(kind, key, call))
+
+		call.waiters += 1
+		try:
+			return await asyncio.shield(call.task), shared
+		finally:
+			call.waiters -= 1
+			if not call.waiters and not call.task.done():
+				call.task.cancel()
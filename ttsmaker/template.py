@@ -0,0 +1,113 @@
+import io
+import string
+
+from .concat import concat_audio
+from .document import SegmentSynthesizer
+from .ttsmaker import TTSError
+
+
+class PhraseTemplate:
+	"""
+	Announcement template such as "Train {n} now arriving at platform {p}", with a finite vocabulary per slot.
+	The fixed text between slots and every slot value are synthesized once and reused for every announcement.
+	"""
+
+	def __init__(self, pattern, slots=None):
+		"""
+		:param pattern: str, str.format style pattern with named fields.
+		:param slots: dict, optional, maps each field name to the iterable of values it can take.
+		"""
+		self.pattern = pattern
+		self.parts = []
+		for literal, field, format_spec, conversion in string.Formatter().parse(pattern):
+			if literal.strip():
+				self.parts.append((literal.strip(), None))
+			if field is not None:
+				if not field or format_spec or conversion:
+					raise ValueError(f"Template fields must be plain names: {pattern!r}")
+				self.parts.append((None, field))
+		self.fields = [field for _, field in self.parts if field is not None]
+		self.slots = {name: [str(value) for value in values] for name, values in (slots or {}).items()}
+		unknown = set(self.slots) - set(self.fields)
+		if unknown:
+			raise ValueError(f"Slots not in template: {', '.join(sorted(unknown))}")
+
+	@property
+	def fixed_segments(self):
+		"""list of str, the fixed text between the slots."""
+		return [literal for literal, _ in self.parts if literal is not None]
+
+	@property
+	def vocabulary(self):
+		"""list of str, every fixed segment and slot value."""
+		return self.fixed_segments + [value for values in self.slots.values() for value in values]
+
+	def segments(self, **values):
+		"""
+		:param values: the value of every slot.
+		:return: list of str, the segments of the announcement in order.
+		"""
+		missing = set(self.fields) - set(values)
+		if missing:
+			raise ValueError(f"Missing template values: {', '.join(sorted(missing))}")
+		return [literal if literal is not None else str(values[field]) for literal, field in self.parts]
+
+
+class TemplateSynthesizer(SegmentSynthesizer):
+	"""
+	Assembles announcements from pre-synthesized template segments, for one voice and set of parameters:
+
+		synthesizer = TemplateSynthesizer(ttsmaker, voice_id=148)
+		arrival = synthesizer.add(PhraseTemplate("Train {n} now arriving at platform {p}", {'n': range(1, 100), 'p': range(1, 13)}))
+		synthesizer.render(arrival, "announcement", n=42, p=7)
+
+	Once prepared, announcements are joined from cached audio without any API call.
+	"""
+
+	def __init__(self, client, voice_id, cache=None, max_workers=8, strict=False, **params):
+		"""
+		:param strict: bool, raise a TTSError for slot values outside the template vocabulary instead of synthesizing them.
+		               Default is False.
+		The other parameters are those of SegmentSynthesizer.
+		"""
+		super().__init__(client, voice_id, cache, max_workers, **params)
+		self.strict = strict
+
+	def add(self, template, prepare=True):
+		"""
+		Register a template, synthesizing its fixed segments and slot vocabulary unless prepare is False.
+		:param template: PhraseTemplate or str.
+		:return: PhraseTemplate
+		"""
+		if isinstance(template, str):
+			template = PhraseTemplate(template)
+		if prepare:
+			self.prepare(template.vocabulary)
+		return template
+
+	def _segments(self, template, values):
+		if self.strict:
+			for name, value in values.items():
+				if name in template.slots and str(value) not in template.slots[name]:
+					raise TTSError(f"Value {value!r} is not in the vocabulary of slot {name!r}")
+		return template.segments(**values)
+
+	def render_bytes(self, template, **values):
+		"""
+		:param template: PhraseTemplate
+		:param values: the value of every slot.
+		:return: bytes, the audio of the announcement.
+		"""
+		segments = self._segments(template, values)
+		output = io.BytesIO()
+		concat_audio((self.audio(segment) for segment in segments), output, self.audio_format)
+		return output.getvalue()
+
+	def render(self, template, filename, **values):
+		"""
+		:param template: PhraseTemplate
+		:param filename: str, file name without extension; audio_format (default 'mp3') is used as extension.
+		:param values: the value of every slot.
+		:return: str, the path of the saved file.
+		"""
+		return self.join(self._segments(template, values), f"{filename}.{self.audio_format}")
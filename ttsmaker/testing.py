@@ -0,0 +1,267 @@
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_VOICES = [
+	{'id': 1504, 'name': 'Mia', 'language': 'zh', 'gender': 'female', 'text_characters_limit': 20000},
+	{'id': 148, 'name': 'Ethan', 'language': 'en', 'gender': 'male', 'text_characters_limit': 20000},
+	{'id': 2, 'name': 'Sora', 'language': 'ja', 'gender': 'female', 'text_characters_limit': 20000},
+]
+
+ENDPOINTS = ('get-voice-list', 'create-tts-order', 'get-token-status', 'download')
+
+
+class _HTTPServer(ThreadingHTTPServer):
+	daemon_threads = True
+	# Benchmarks open many connections at once, the default backlog of 5 would make clients wait for SYN retransmits
+	request_queue_size = 1024
+
+
+def constant(seconds):
+	"""Latency distribution always returning seconds."""
+	return lambda: seconds
+
+
+def uniform(low, high):
+	"""Latency distribution uniform between low and high seconds."""
+	return lambda: random.uniform(low, high)
+
+
+def lognormal(median, sigma=0.5):
+	"""Long-tailed latency distribution with the given median in seconds."""
+	return lambda: random.lognormvariate(0, sigma) * median
+
+
+class MockServer:
+	"""
+	Local stand-in for the TTSMaker API, for tests and benchmarks.
+	It implements get-voice-list, create-tts-order, get-token-status and the download of the generated audio files,
+	with configurable latency, error rate, quota and audio size. It runs in a background thread:
+
+		with MockServer(latency={'create-tts-order': lognormal(0.2)}) as server:
+			ttsmaker = TTSMaker(base_url=server.base_url)
+	"""
+
+	def __init__(self, host='127.0.0.1', port=0, voices=None, latency=None, error_rate=0.0, quota_characters=1000000, bytes_per_character=1000, audio_size=None, bytes_per_second=None):
+		"""
+		:param host: str, interface to listen on. Default is '127.0.0.1'.
+		:param port: int, port to listen on. Default is 0, which picks a free port.
+		:param voices: list of dict, the voices returned by get-voice-list. Default is DEFAULT_VOICES.
+		:param latency: callable or dict, latency distribution applied before each response, either one callable returning
+		                seconds for every endpoint or a dict mapping endpoint names in ENDPOINTS to such callables.
+		:param error_rate: float or dict, probability of answering HTTP 503, either for every endpoint or per endpoint name.
+		:param quota_characters: int or dict, characters a token can synthesize before orders fail with a quota error,
+		                         either for every token or per token, tokens missing from the dict having no quota.
+		:param bytes_per_character: int, size of the generated audio per character of text. Default is 1000.
+		:param audio_size: callable, optional, returns the audio size in bytes for a text. Overrides bytes_per_character.
+		:param bytes_per_second: int, optional, throttles audio downloads to this rate.
+		"""
+		self.voices = voices if voices is not None else DEFAULT_VOICES
+		self.latency = latency
+		self.error_rate = error_rate
+		self.quota_characters = quota_characters
+		self.characters_used = Counter()
+		self.audio_size = audio_size or (lambda text: max(1, len(text)) * bytes_per_character)
+		self.bytes_per_second = bytes_per_second
+		self.requests = Counter()
+		self.errors = Counter()
+		self.orders = {}
+		self._order_ids = itertools.count(1)
+		self._lock = threading.Lock()
+		self._thread = None
+		self._httpd = _HTTPServer((host, port), self._handler_class())
+
+	@property
+	def url(self):
+		host, port = self._httpd.server_address[:2]
+		return f"http://{host}:{port}/"
+
+	@property
+	def base_url(self):
+		"""API root URL to pass as TTSMaker(base_url=...)."""
+		return f"{self.url}v1/"
+
+	def start(self):
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._httpd.serve_forever, name='ttsmaker-mock-server', daemon=True)
+			self._thread.start()
+		return self
+
+	def stop(self):
+		if self._thread is not None:
+			self._httpd.shutdown()
+			self._thread.join()
+			self._thread = None
+		self._httpd.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+
+	def reset(self):
+		"""Clear counters, orders and used quota."""
+		with self._lock:
+			self.characters_used.clear()
+			self.requests.clear()
+			self.errors.clear()
+			self.orders.clear()
+
+	def _quota(self, token):
+		if isinstance(self.quota_characters, dict):
+			return self.quota_characters.get(token, 0)
+		return self.quota_characters
+
+	def _setting(self, value, endpoint):
+		if isinstance(value, dict):
+			return value.get(endpoint)
+		return value
+
+	def _handle(self, endpoint, params):
+		"""
+		:return: tuple of (HTTP status, dict JSON body) for API endpoints, or (HTTP status, order dict) for downloads.
+		"""
+		with self._lock:
+			self.requests[endpoint] += 1
+		latency = self._setting(self.latency, endpoint)
+		if latency:
+			time.sleep(max(0.0, latency()))
+		error_rate = self._setting(self.error_rate, endpoint) or 0.0
+		if error_rate and random.random() < error_rate:
+			with self._lock:
+				self.errors[endpoint] += 1
+			return 503, {'status': 'error', 'error_details': 'Service temporarily unavailable'}
+
+		if endpoint == 'get-voice-list':
+			language = params.get('language')
+			voices = [voice for voice in self.voices if not language or voice.get('language') == language]
+			return 200, {
+				'status': 'success',
+				'error_code': '0',
+				'support_language_list': sorted({voice.get('language') for voice in self.voices}),
+				'voices_id_list': [voice['id'] for voice in voices],
+				'voices_detailed_list': voices,
+			}
+
+		if endpoint == 'get-token-status':
+			token = params.get('token')
+			with self._lock:
+				used = self.characters_used[token]
+			quota = self._quota(token)
+			return 200, {
+				'status': 'success',
+				'error_code': '0',
+				'token_status': {
+					'current_cycle_max_characters': quota,
+					'current_cycle_characters_used': used,
+					'current_cycle_characters_available': max(0, quota - used),
+					'remaining_days': 30,
+				},
+			}
+
+		if endpoint == 'create-tts-order':
+			text = params.get('text') or ''
+			if not text:
+				return 200, {'status': 'error', 'error_code': 'TEXT_EMPTY', 'error_details': 'Text is empty'}
+			if not any(voice['id'] == params.get('voice_id') for voice in self.voices):
+				return 200, {'status': 'error', 'error_code': 'VOICE_ID_ERROR', 'error_details': 'Invalid voice_id'}
+			audio_format = params.get('audio_format', 'mp3')
+			token = params.get('token')
+			with self._lock:
+				if self.characters_used[token] + len(text) > self._quota(token):
+					return 200, {'status': 'error', 'error_code': 'QUOTA_EXHAUSTED', 'error_details': 'Token quota exhausted'}
+				self.characters_used[token] += len(text)
+				order_id = next(self._order_ids)
+				self.orders[order_id] = {'size': self.audio_size(text), 'audio_format': audio_format}
+			return 200, {
+				'status': 'success',
+				'error_code': '0',
+				'audio_file_url': f"{self.url}files/{order_id}.{audio_format}",
+				'audio_file_type': audio_format,
+				'audio_file_expire_time': int(time.time()) + 7200,
+				'tts_order_characters': len(text),
+			}
+
+		order_id = params.get('order_id')
+		with self._lock:
+			order = self.orders.get(order_id)
+		if order is None:
+			return 404, None
+		return 200, order
+
+	def _handler_class(self):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+			disable_nagle_algorithm = True
+
+			def log_message(self, format, *args):
+				pass
+
+			def _send_json(self, status, body):
+				data = json.dumps(body).encode('utf-8')
+				self.send_response(status)
+				self.send_header('Content-Type', 'application/json; charset=utf-8')
+				self.send_header('Content-Length', str(len(data)))
+				self.end_headers()
+				self.wfile.write(data)
+
+			def _send_audio(self, order):
+				size = order['size']
+				self.send_response(200)
+				self.send_header('Content-Type', f"audio/{order['audio_format']}")
+				self.send_header('Content-Length', str(size))
+				self.end_headers()
+				block = bytes(range(256)) * 256
+				started = time.monotonic()
+				sent = 0
+				while sent < size:
+					n = min(len(block), size - sent)
+					self.wfile.write(block[:n])
+					sent += n
+					if server.bytes_per_second:
+						ahead = sent / server.bytes_per_second - (time.monotonic() - started)
+						if ahead > 0:
+							time.sleep(ahead)
+
+			def _dispatch(self, params):
+				path = urlparse(self.path).path
+				if path.startswith('/files/'):
+					try:
+						params['order_id'] = int(path[len('/files/'):].split('.')[0])
+					except ValueError:
+						params['order_id'] = None
+					status, order = server._handle('download', params)
+					if status == 200:
+						self._send_audio(order)
+					else:
+						self._send_json(status, {'status': 'error', 'error_details': 'Not found'})
+					return
+				endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+				if endpoint not in ENDPOINTS:
+					self._send_json(404, {'status': 'error', 'error_details': 'Not found'})
+					return
+				status, body = server._handle(endpoint, params)
+				self._send_json(status, body)
+
+			def do_GET(self):
+				query = parse_qs(urlparse(self.path).query)
+				self._dispatch({key: values[0] for key, values in query.items()})
+
+			def do_POST(self):
+				length = int(self.headers.get('Content-Length') or 0)
+				try:
+					params = json.loads(self.rfile.read(length) or b'{}')
+				except ValueError:
+					self._send_json(400, {'status': 'error', 'error_details': 'Invalid JSON'})
+					return
+				self._dispatch(params)
+
+		return Handler
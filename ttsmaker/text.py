@@ -0,0 +1,76 @@
+import re
+
+# Sentence ends: CJK and ASCII terminal punctuation, optionally followed by closing quotes or brackets
+_SENTENCE_END = re.compile(r'(?<=[。！？；…!?;])[”’」』）)"\']*|(?<=\.)[”’"\')]*(?=\s)')
+_CLAUSE_END = re.compile(r'(?<=[，、：,:])')
+_WORD_END = re.compile(r'(?<=\s)(?=\S)')
+_PARAGRAPH = re.compile(r'\n\s*\n')
+
+
+def _split_keep(pattern, text):
+	pieces, start = [], 0
+	for match in pattern.finditer(text):
+		end = match.end()
+		if end > start:
+			pieces.append(text[start:end])
+			start = end
+	if start < len(text):
+		pieces.append(text[start:])
+	return pieces
+
+
+def _pieces(sentence, max_chars, patterns=(_CLAUSE_END, _WORD_END)):
+	if len(sentence.strip()) <= max_chars:
+		return [sentence]
+	if not patterns:
+		sentence = sentence.strip()
+		return [sentence[start:start + max_chars] for start in range(0, len(sentence), max_chars)]
+	pieces = []
+	for part in _split_keep(patterns[0], sentence):
+		pieces.extend(_pieces(part, max_chars, patterns[1:]))
+	return pieces
+
+
+def split_text(text, max_chars=2000):
+	"""
+	Split text into chunks of at most max_chars characters, at paragraph and sentence boundaries where possible.
+	Sentences end at 。！？；… as well as ASCII . ! ? ; punctuation. A sentence longer than max_chars is split
+	at clause punctuation such as ， or , then between words, and cut at max_chars as a last resort.
+
+	:param text: str, the text to split.
+	:param max_chars: int, maximum number of characters per chunk. Default is 2000.
+	:return: list of str, the chunks in order. Joining them gives back the text, except for whitespace at chunk edges.
+	"""
+	if max_chars < 1:
+		raise ValueError("max_chars must be positive")
+	chunks, current = [], ''
+	for paragraph in _split_keep(_PARAGRAPH, text):
+		for sentence in _split_keep(_SENTENCE_END, paragraph):
+			for piece in _pieces(sentence, max_chars):
+				if current.strip() and len((current + piece).strip()) > max_chars:
+					chunks.append(current)
+					current = ''
+				current += piece
+	if current:
+		chunks.append(current)
+	return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def split_paragraphs(text):
+	"""
+	:param text: str, the text to split.
+	:return: list of str, the paragraphs of text, separated by blank lines, without their surrounding whitespace.
+	"""
+	return [paragraph.strip() for paragraph in _split_keep(_PARAGRAPH, text) if paragraph.strip()]
+
+
+def split_paragraph_chunks(text, max_chars=500):
+	"""
+	Split text like split_text, but never pack two paragraphs into one chunk.
+	An edit to one paragraph then only changes the chunks of that paragraph, which makes the chunks usable as cache units.
+
+	:param text: str, the text to split.
+	:param max_chars: int, maximum number of characters per chunk. Default is 500.
+	:return: list of str, the chunks in order.
+	"""
+	return [chunk for paragraph in split_paragraphs(text) for chunk in split_text(paragraph, max_chars)]
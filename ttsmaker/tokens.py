@@ -0,0 +1,84 @@
+from .quota import QuotaTracker
+from .singleflight import SingleFlight
+from .ttsmaker import QuotaExhaustedError
+
+
+class TokenPool:
+	"""
+	Several developer tokens, orders being spread across them by remaining quota.
+	Each token's quota is kept by a QuotaTracker, synced from get_token_status every sync_interval seconds.
+	A token that reports quota exhaustion is taken out of rotation until the next sync shows quota again.
+	"""
+
+	def __init__(self, client, tokens, sync_interval=600):
+		"""
+		:param client: TTSMaker, the client used to fetch token statuses.
+		:param tokens: iterable of str, developer tokens.
+		:param sync_interval: float, seconds between two syncs of the token statuses. Default is 600.
+		"""
+		self.client = client
+		self.tokens = list(dict.fromkeys(tokens))
+		if not self.tokens:
+			raise ValueError("At least one token is required")
+		self.sync_interval = sync_interval
+		singleflight = SingleFlight()
+		self.trackers = {token: QuotaTracker(client, token, sync_interval, singleflight) for token in self.tokens}
+
+	def sync(self, force=False):
+		"""
+		Fetch the status of every token whose last sync is older than sync_interval.
+		Concurrent callers share each fetch. A token whose status cannot be fetched keeps its previous quota.
+		:param force: bool, sync even if the last sync is recent. Default is False.
+		"""
+		for tracker in self.trackers.values():
+			tracker.sync(force)
+
+	def acquire(self, characters):
+		"""
+		Choose the token with the most remaining quota for an order, and count its characters as in flight.
+		Tokens whose quota is unknown are used, least used first, only when no token is known to have enough quota.
+		:param characters: int, length of the order text.
+		:return: str, the token. A QuotaExhaustedError exception is raised if no token has enough quota left.
+		"""
+		self.sync()
+		while True:
+			candidates = []
+			for token, stats in self.stats.items():
+				remaining = stats['remaining']
+				if not stats['exhausted'] and (remaining is None or remaining >= characters):
+					candidates.append(((remaining is not None, remaining or 0, -stats['used'] - stats['pending']), token))
+			if not candidates:
+				raise QuotaExhaustedError(f"No token has {characters} characters of quota left")
+			token = max(candidates)[1]
+			try:
+				self.trackers[token].reserve(characters)
+			except QuotaExhaustedError:
+				# Another caller took the quota in the meantime
+				continue
+			return token
+
+	def commit(self, token, characters):
+		"""Count the characters of a successful order acquired for token."""
+		self.trackers[token].commit(characters)
+
+	def charge(self, token, characters):
+		"""Count characters spent for token without an acquisition, such as by the duplicate of a hedged order."""
+		self.trackers[token].charge(characters)
+
+	def release(self, token, characters):
+		"""Give back the characters of a failed order acquired for token."""
+		self.trackers[token].release(characters)
+
+	def exhausted(self, token, characters=0):
+		"""
+		Take token out of rotation, after it reported quota exhaustion.
+		:param characters: int, characters of the failed order acquired for token, given back.
+		"""
+		self.trackers[token].mark_exhausted(characters)
+
+	@property
+	def stats(self):
+		"""
+		:return: dict mapping each token to the stats of its QuotaTracker.
+		"""
+		return {token: tracker.stats for token, tracker in self.trackers.items()}
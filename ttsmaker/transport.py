@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import NamedTuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Seconds spent opening connections by the request running in the current thread
+_connect_time = threading.local()
+
+
+class RequestTiming(NamedTuple):
+	"""Phases of one HTTP request, in seconds."""
+	# Opening a new connection, DNS, TCP and TLS included. 0.0 when a keep-alive connection was reused
+	connect: float
+	# From sending the request to receiving the response headers, connect included
+	ttfb: float
+	# Reading the response body after the headers
+	transfer: float
+	# Bytes of response body received
+	bytes: int
+
+	@property
+	def server(self):
+		"""Time the server took to answer once the request was sent, network round trip included."""
+		return max(0.0, self.ttfb - self.connect)
+
+	@property
+	def total(self):
+		return self.ttfb + self.transfer
+
+
+class _TimedConnectionMixin:
+	def connect(self):
+		started = time.perf_counter()
+		try:
+			super().connect()
+		finally:
+			_connect_time.value = getattr(_connect_time, 'value', 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+	pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+	pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+	ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+	ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+	"""HTTPAdapter setting response.connect_time, the seconds spent opening a connection for the request."""
+
+	def init_poolmanager(self, *args, **kwargs):
+		super().init_poolmanager(*args, **kwargs)
+		self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+
+	def send(self, request, *args, **kwargs):
+		_connect_time.value = 0.0
+		response = super().send(request, *args, **kwargs)
+		response.connect_time = _connect_time.value
+		return response
+
+
+class HTTPTransport:
+	"""
+	Pooled, keep-alive HTTP transport shared by a TTSMaker client and the orders it creates.
+	API calls and audio downloads go through separate sessions, so a burst of large downloads
+	cannot starve the connection pool used for order creation.
+	Responses carry connect_time, the seconds spent opening a new connection for them, 0.0 for a reused connection.
+	Connections through a proxy are not timed.
+	"""
+
+	def __init__(self, pool_connections=4, pool_maxsize=10, download_pool_maxsize=None):
+		"""
+		Initialize the transport.
+		:param pool_connections: int, number of per-host connection pools each session keeps cached.
+		:param pool_maxsize: int, maximum number of keep-alive connections per host for API calls.
+		:param download_pool_maxsize: int, maximum number of keep-alive connections per host for audio downloads.
+		                              Default is None, which uses the same value as pool_maxsize.
+		"""
+		self.pool_connections = pool_connections
+		self.pool_maxsize = pool_maxsize
+		self.download_pool_maxsize = download_pool_maxsize or pool_maxsize
+		self._lock = threading.Lock()
+		self._api_session = None
+		self._download_session = None
+
+	def _make_session(self, pool_maxsize):
+		session = requests.Session()
+		adapter = _TimedHTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+		session.mount('https://', adapter)
+		session.mount('http://', adapter)
+		return session
+
+	@property
+	def api_session(self):
+		"""requests.Session used for calls to the TTSMaker API host."""
+		if self._api_session is None:
+			with self._lock:
+				if self._api_session is None:
+					self._api_session = self._make_session(self.pool_maxsize)
+		return self._api_session
+
+	@property
+	def download_session(self):
+		"""requests.Session used for downloading generated audio files."""
+		if self._download_session is None:
+			with self._lock:
+				if self._download_session is None:
+					self._download_session = self._make_session(self.download_pool_maxsize)
+		return self._download_session
+
+	def get(self, url, **kwargs):
+		return self.api_session.get(url, **kwargs)
+
+	def post(self, url, **kwargs):
+		return self.api_session.post(url, **kwargs)
+
+	def download(self, url, **kwargs):
+		return self.download_session.get(url, **kwargs)
+
+	def close(self):
+		"""Close both sessions and release all pooled connections."""
+		with self._lock:
+			for session in (self._api_session, self._download_session):
+				if session is not None:
+					session.close()
+			self._api_session = None
+			self._download_session = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
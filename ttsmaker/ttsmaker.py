@@ -1,52 +1,378 @@
-import requests
 import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+from .cache import cache_key
+from .concat import concat_audio
+from .hooks import Hooks
+from .logs import BatchSummary, log_saved
+from .probe import probe_audio
+from .silence import Pause
+from .singleflight import SingleFlight
+from .text import split_paragraphs, split_text
+from .transport import HTTPTransport, RequestTiming
+from .utils import DEFAULT_CHUNK_SIZE, atomic_file
 
 class TTSError(Exception):
 	"""Custom exception class for handling errors in TTS orders"""
 	pass
 
+
+class TransientTTSError(TTSError):
+	"""TTSError caused by a condition that may go away on retry, such as an HTTP 429 or 5xx response"""
+	pass
+
+
+class QuotaExhaustedError(TTSError):
+	"""TTSError raised when the token has not enough quota characters left for an order"""
+	pass
+
+
+DEFAULT_BASE_URL = "https://api.ttsmaker.cn/v1/"
+JSON_HEADERS = {'Content-Type': 'application/json; charset=utf-8'}
+# Error codes of create-tts-order meaning the token has run out of characters
+_QUOTA_ERROR_CODE = re.compile(r'QUOTA|NOT_ENOUGH|INSUFFICIENT', re.IGNORECASE)
+
+
+def order_payload(token, text, voice_id, audio_format='mp3', audio_speed=1.0, audio_volume=0, text_paragraph_pause_time=0):
+	"""
+	Build the JSON body of a create-tts-order request.
+	:return: dict, the request body.
+	"""
+	return {
+		'token': token,
+		'text': text,
+		'voice_id': voice_id,
+		'audio_format': audio_format,
+		'audio_speed': audio_speed,
+		'audio_volume': audio_volume,
+		'text_paragraph_pause_time': text_paragraph_pause_time
+	}
+
+
+def check_order_response(tts_data):
+	"""
+	Validate the JSON response of a create-tts-order request.
+	:param tts_data: dict, the decoded response.
+	:return: dict, tts_data unchanged if the order succeeded. Otherwise a TTSError exception is raised.
+	"""
+	if tts_data.get('status') != 'success':
+		error_class = QuotaExhaustedError if _QUOTA_ERROR_CODE.search(str(tts_data.get('error_code', ''))) else TTSError
+		raise error_class(f"TTS generation failed: {tts_data.get('error_details', 'Unknown error')}")
+	return tts_data
+
+
+def is_transient_status(status_code):
+	return status_code == 429 or status_code >= 500
+
+
+def _hooked_request(hooks, endpoint, send, url, **kwargs):
+	"""
+	Send a request whose body is read before send returns, emitting the request_start, request_end and error events.
+	:return: requests.Response
+	"""
+	hooks.emit('request_start', endpoint=endpoint)
+	started = time.perf_counter()
+	try:
+		response = send(url, **kwargs)
+	except Exception as e:
+		hooks.emit('request_end', endpoint=endpoint, status='error', elapsed=time.perf_counter() - started, bytes=0)
+		hooks.emit('error', endpoint=endpoint, error=e)
+		raise
+	hooks.emit('request_end', endpoint=endpoint, status=response.status_code, elapsed=time.perf_counter() - started, bytes=len(response.content))
+	return response
+
+
+def _run_with_retry(policy, func, on_retry):
+	if policy is None:
+		return func()
+	return policy.run(func, on_retry)
+
+
+class BatchResult(NamedTuple):
+	"""Outcome of one job of TTSMaker.synthesize_many."""
+	index: int
+	order: 'TTSOrder'
+	filepath: str
+	error: TTSError
+
+	@property
+	def ok(self):
+		return self.error is None
+
+
 class TTSOrder:
-	def __init__(self, tts_data):
+	def __init__(self, tts_data, transport=None, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, cache_key=None, download_retry=None, singleflight=None, on_timing=None, hooks=None):
 		"""
 		Initialize the TTSOrder class.
 		:param tts_data: dict, contains relevant information about the generated TTS order.
+		:param transport: HTTPTransport, optional, the pooled transport used to download the audio file.
+		                  If None, a private transport is created on first download.
+		:param chunk_size: int, size in bytes of the chunks the audio file is downloaded in. Default is 64 KiB.
+		:param cache: AudioCache, optional, cache the downloaded audio is stored in under cache_key.
+		:param cache_key: str, optional, key of this order in the cache.
+		:param download_retry: RetryPolicy, optional, how failed downloads of audio_file_url are retried. Default is no retry.
+		:param singleflight: SingleFlight, optional, if given concurrent save_audio calls share a single download.
+		:param on_timing: callable, optional, called as on_timing(order, 'download', RequestTiming) after each download.
+		:param hooks: Hooks, optional, receives the request_start, request_end, retry and error events of downloads.
 		"""
+		self.transport = transport
+		self.chunk_size = chunk_size
+		self.cache = cache
+		self.cache_key = cache_key
+		self.download_retry = download_retry
+		self.singleflight = singleflight
+		self.audio_data = None
+		# Path of the file written by the last save_audio
+		self.filepath = None
+		# Number of retries spent creating this order and downloading its audio, and seconds slept in backoff
+		self.create_retries = 0
+		self.download_retries = 0
+		self.retry_wait = 0.0
+		# RequestTiming of the request that created this order, and of the last complete audio download
+		self.create_timing = None
+		self.download_timing = None
+		self.on_timing = on_timing
+		self.hooks = hooks or Hooks()
 		self.status = tts_data.get('status')
 		self.error_details = tts_data.get('error_details')
 		self.audio_file_url = tts_data.get('audio_file_url')
 		self.audio_file_type = tts_data.get('audio_file_type')
 		self.tts_data = tts_data
 
-	def save_audio(self, filename):
+	@classmethod
+	def from_cached_audio(cls, audio_data, audio_format, cache_key=None, chunk_size=DEFAULT_CHUNK_SIZE):
+		"""
+		Create an order for audio served from a cache. Saving or streaming it makes no network call.
+		:param audio_data: bytes, the cached audio file content.
+		:param audio_format: str, the audio file type.
+		:param cache_key: str, optional, key of the audio in the cache.
+		:return: TTSOrder
+		"""
+		order = cls({'status': 'success', 'audio_file_type': audio_format, 'from_cache': True}, chunk_size=chunk_size, cache_key=cache_key)
+		order.audio_data = audio_data
+		return order
+
+	@property
+	def from_cache(self):
+		return self.audio_data is not None
+
+	def _on_download_retry(self, retry, error, delay):
+		self.download_retries += 1
+		self.retry_wait += delay
+		self.hooks.emit('retry', endpoint='download', attempt=retry, error=error, delay=delay)
+
+	def _record_timing(self, phase, timing):
+		if phase == 'create':
+			self.create_timing = timing
+		else:
+			self.download_timing = timing
+		if self.on_timing is not None:
+			self.on_timing(self, phase, timing)
+
+	def _iter_download(self, chunk_size):
+		if self.transport is None:
+			self.transport = HTTPTransport()
+		# Only a fully downloaded file is stored in the cache
+		buffer = [] if self.cache is not None and self.cache_key else None
+		received = 0
+		status = 'error'
+		error = None
+		self.hooks.emit('request_start', endpoint='download')
+		started = time.perf_counter()
+		try:
+			with self.transport.download(self.audio_file_url, stream=True) as response:
+				status = response.status_code
+				if status != 200:
+					error_class = TransientTTSError if is_transient_status(status) else TTSError
+					raise error_class(f"Failed to download audio file from URL: {self.audio_file_url}")
+				headers_at = time.perf_counter()
+				for chunk in response.iter_content(chunk_size):
+					if chunk:
+						received += len(chunk)
+						if buffer is not None:
+							buffer.append(chunk)
+						yield chunk
+		except Exception as e:
+			error = e
+			raise
+		finally:
+			# Also reached when the consumer stops iterating early
+			self.hooks.emit('request_end', endpoint='download', status=status, elapsed=time.perf_counter() - started, bytes=received)
+			if error is not None:
+				self.hooks.emit('error', endpoint='download', error=error)
+		transfer = time.perf_counter() - headers_at
+		self._record_timing('download', RequestTiming(getattr(response, 'connect_time', 0.0), response.elapsed.total_seconds(), transfer, received))
+		if buffer is not None:
+			self.cache.set(self.cache_key, b''.join(buffer), self.audio_file_type)
+
+	def stream_audio(self, chunk_size=None):
+		"""
+		Download the audio file without buffering it, yielding it chunk by chunk.
+		Failures before the first chunk are retried according to download_retry; later failures are raised,
+		as the chunks already yielded cannot be taken back.
+		:param chunk_size: int, optional, chunk size in bytes. Default is None, which uses the order's chunk_size.
+		:return: generator of bytes.
+		"""
+		if self.status != 'success':
+			raise TTSError(f"Cannot save audio. TTS generation failed: {self.error_details}")
+
+		chunk_size = chunk_size or self.chunk_size
+		if self.audio_data is not None:
+			for start in range(0, len(self.audio_data), chunk_size):
+				yield self.audio_data[start:start + chunk_size]
+			return
+
+		def start():
+			chunks = self._iter_download(chunk_size)
+			return next(chunks, None), chunks
+
+		first, chunks = _run_with_retry(self.download_retry, start, self._on_download_retry)
+		if first is not None:
+			yield first
+			yield from chunks
+
+	def save_audio(self, filename, chunk_size=None):
 		"""
 		Save the audio file to local storage.
+		The file is streamed to a temporary file next to the target and renamed once complete,
+		so a partially downloaded file never appears under the final name.
+		A failed download is retried according to download_retry, without creating a new order.
 		:param filename: str, file name, extension is not required as the audio file type will be used.
+		:param chunk_size: int, optional, chunk size in bytes. Default is None, which uses the order's chunk_size.
+		:return: str, the path of the saved file.
 		"""
 		if self.status != 'success':
 			raise TTSError(f"Cannot save audio. TTS generation failed: {self.error_details}")
 
+		started = time.perf_counter()
 		audio_format = self.audio_file_type
 		filepath = f"{filename}.{audio_format}"
-		
-		# Download the audio file
-		response = requests.get(self.audio_file_url)
-		if response.status_code == 200:
-			with open(filepath, 'wb') as f:
-				f.write(response.content)
-			print(f"Audio file saved as {filepath}")
+		chunk_size = chunk_size or self.chunk_size
+		size = 0
+
+		def download():
+			nonlocal size
+			with atomic_file(filepath) as f:
+				if self.audio_data is not None:
+					f.write(self.audio_data)
+				else:
+					for chunk in self._iter_download(chunk_size):
+						f.write(chunk)
+				size = f.tell()
+
+		if self.singleflight is None or self.audio_data is not None:
+			_run_with_retry(self.download_retry, download, self._on_download_retry)
+		else:
+			def shared_download():
+				_run_with_retry(self.download_retry, download, self._on_download_retry)
+				return filepath
+
+			source, shared = self.singleflight.do('download', self.audio_file_url, shared_download)
+			if shared and os.path.abspath(source) != os.path.abspath(filepath):
+				with open(source, 'rb') as src, atomic_file(filepath) as f:
+					shutil.copyfileobj(src, f)
+					size = f.tell()
+			elif shared:
+				size = os.path.getsize(filepath)
+		self.filepath = filepath
+		log_saved(filepath, size, time.perf_counter() - started)
+		return filepath
+
+	def probe(self, full=False):
+		"""
+		Find the duration, bitrate and integrity of the audio from its headers, without decoding it, see probe_audio.
+		The cached audio or the file written by save_audio is read, otherwise the audio is downloaded into memory.
+		:param full: bool, if True every frame or page header is checked. Default is False.
+		:return: AudioInfo
+		"""
+		if self.status != 'success':
+			raise TTSError(f"Cannot probe audio. TTS generation failed: {self.error_details}")
+		if self.audio_data is not None:
+			source = self.audio_data
+		elif self.filepath is not None and os.path.exists(self.filepath):
+			source = self.filepath
 		else:
-			raise TTSError(f"Failed to download audio file from URL: {self.audio_file_url}")
+			source = b''.join(self.stream_audio())
+		return probe_audio(source, self.audio_file_type, full)
 
 
 class TTSMaker:
-	def __init__(self, token='ttsmaker_demo_token'):
+	def __init__(self, token='ttsmaker_demo_token', pool_connections=4, pool_maxsize=10, download_pool_maxsize=None, transport=None, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, voice_catalog=None, rate_limiter=None, create_retry=None, download_retry=None, base_url=None, coalesce=False, quota_sync_interval=None, on_timing=None, hedge=None):
 		"""
 		Initialize the TTSMaker class with the developer token.
 		:param token: str, developer token for API request authentication, default value is 'ttsmaker_demo_token'.
+		              A list of tokens creates a TokenPool: orders are spread across the tokens by remaining quota,
+		              and a token reporting quota exhaustion is taken out of rotation while orders fail over to the others.
+		:param pool_connections: int, number of per-host connection pools to keep cached. Default is 4.
+		:param pool_maxsize: int, maximum keep-alive connections per host for API calls. Default is 10.
+		:param download_pool_maxsize: int, maximum keep-alive connections per host for audio downloads.
+		                              Default is None, which uses the same value as pool_maxsize.
+		:param transport: HTTPTransport, optional, an existing transport to share between several clients.
+		                  If given, the pool size parameters are ignored.
+		:param chunk_size: int, size in bytes of the chunks audio files are downloaded in. Default is 64 KiB.
+		:param cache: AudioCache, optional, cache of synthesized audio such as MemoryCache or DiskCache.
+		              Orders whose text, voice and parameters are cached are served without any network call.
+		:param voice_catalog: VoiceCatalog, optional, if given voice_id is checked against it before creating an order.
+		:param rate_limiter: RateLimiter, optional, paces order creation to the account's request and character limits.
+		                     The same limiter can be shared by several clients, threads and asyncio tasks.
+		:param create_retry: RetryPolicy, optional, how transient create_tts_order failures are retried. Default is no retry.
+		:param download_retry: RetryPolicy, optional, how failed audio downloads are retried. Default is no retry.
+		                       Downloads are retried against the order's audio_file_url, so no quota is spent again.
+		:param base_url: str, optional, API root URL, for example the url of a ttsmaker.testing.MockServer. Default is the public TTSMaker API.
+		:param coalesce: bool, share one order and one download between concurrent identical create_tts_order calls.
+		                 The number of deduplicated calls is reported by singleflight.stats. Default is False.
+		:param quota_sync_interval: float, optional, seconds between two syncs of the local quota account with
+		                            get_token_status. If given, a QuotaTracker subtracts the text of each order from the
+		                            token's quota in between, and orders that would overrun it raise QuotaExhaustedError
+		                            without being sent. Default is None, which tracks the quota of a token list every
+		                            600 seconds and does not track the quota of a single token.
+		:param on_timing: callable, optional, called as on_timing(order, phase, timing) with phase 'create' once an order
+		                  is created and 'download' once its audio is downloaded, timing being a RequestTiming of the
+		                  connect, time-to-first-byte, server and transfer times and the bytes received.
+		                  The same timings are kept by the order as create_timing and download_timing.
+		:param hedge: HedgePolicy, optional, sends a duplicate create_tts_order request for short texts when the first one
+		              is slower than most recent requests, keeping the first answer. Default is no hedging.
 		"""
+		# quota and tokens import TTSError from this module
+		from .quota import QuotaTracker
+		from .tokens import TokenPool
+		self.token_pool = None
+		self.quota_tracker = None
+		if isinstance(token, (list, tuple)):
+			self.token_pool = TokenPool(self, token, quota_sync_interval or 600)
+			token = self.token_pool.tokens[0]
 		self.token = token or 'ttsmaker_demo_token'
-		self.base_url = "https://api.ttsmaker.cn/v1/"
+		if quota_sync_interval is not None and self.token_pool is None:
+			self.quota_tracker = QuotaTracker(self, self.token, quota_sync_interval)
+		self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/') + '/'
+		self.transport = transport or HTTPTransport(pool_connections, pool_maxsize, download_pool_maxsize)
+		self.chunk_size = chunk_size
+		self.cache = cache
+		self.voice_catalog = voice_catalog
+		self.rate_limiter = rate_limiter
+		self.create_retry = create_retry
+		self.download_retry = download_retry
+		self.singleflight = SingleFlight() if coalesce else None
+		self.on_timing = on_timing
+		self.hedge = hedge
+		# Callbacks of the request_start, request_end, retry, cache_hit and error events, see ttsmaker.hooks
+		self.hooks = Hooks()
+
+	def close(self):
+		"""Release all pooled connections held by this client."""
+		self.transport.close()
+
+	def __enter__(self):
+		return self
 
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
 
 	def get_voice_list(self, language='zh'):
 		"""
@@ -60,7 +386,7 @@ class TTSMaker:
 		params = {'token': self.token}
 		if language:
 			params['language'] = language
-		response = requests.get(url, params=params)
+		response = _hooked_request(self.hooks, 'get-voice-list', self.transport.get, url, params=params)
 		return response.json()
 
 
@@ -79,38 +405,203 @@ class TTSMaker:
 		:param text_paragraph_pause_time: int, paragraph pause time, optional parameter. 
 		                                  Used to insert pauses between paragraphs automatically, in milliseconds. Range is from 500 to 5000 ms. 
 		                                  A maximum of 50 pauses can be inserted; if exceeded, the pauses will be automatically canceled. Default is 0, no pause insertion.
+		                                  synthesize_long and concat_audio can insert pauses on the client instead, without these limits.
 		
 		:return: TTSOrder, an object containing the TTS order result. If the order fails, a TTSError exception will be raised.
 		"""
+		if self.voice_catalog is not None:
+			self.voice_catalog.validate(voice_id)
+
+		key = None
+		if self.cache is not None or self.singleflight is not None:
+			key = cache_key(text, voice_id, audio_format, audio_speed, audio_volume, text_paragraph_pause_time)
+		if self.cache is not None:
+			audio_data = self.cache.get(key)
+			if audio_data is not None:
+				self.hooks.emit('cache_hit', key=key)
+				return TTSOrder.from_cached_audio(audio_data, audio_format, key, self.chunk_size)
+
 		url = f"{self.base_url}create-tts-order"
-		headers = {'Content-Type': 'application/json; charset=utf-8'}
-		data = {
-			'token': self.token,
-			'text': text,
-			'voice_id': voice_id,
-			'audio_format': audio_format,
-			'audio_speed': audio_speed,
-			'audio_volume': audio_volume,
-			'text_paragraph_pause_time': text_paragraph_pause_time
-		}
+		retries = []
+
+		def send(token):
+			data = order_payload(token, text, voice_id, audio_format, audio_speed, audio_volume, text_paragraph_pause_time)
+			started = time.perf_counter()
+			response = _hooked_request(self.hooks, 'create-tts-order', self.transport.post, url, headers=JSON_HEADERS, data=json.dumps(data))
+			ttfb = response.elapsed.total_seconds()
+			timing = RequestTiming(getattr(response, 'connect_time', 0.0), ttfb, max(0.0, time.perf_counter() - started - ttfb), len(response.content))
+			try:
+				if is_transient_status(response.status_code):
+					raise TransientTTSError(f"TTS generation failed: HTTP {response.status_code}")
+				return check_order_response(response.json()), timing
+			except Exception as e:
+				self.hooks.emit('error', endpoint='create-tts-order', error=e)
+				raise
+
+		def on_retry(retry, error, delay):
+			retries.append(delay)
+			self.hooks.emit('retry', endpoint='create-tts-order', attempt=retry, error=error, delay=delay)
 
-		response = requests.post(url, headers=headers, data=json.dumps(data))
-		tts_data = response.json()
+		def hedged(token, on_both_succeeded=None):
+			# Only the request itself is hedged: quota is accounted once per order by post, and a duplicate
+			# is sent only if the rate limits have room for it right away
+			if self.hedge is None:
+				return send(token)
+			permit = None
+			if self.rate_limiter is not None:
+				permit = lambda: self.rate_limiter.try_acquire(len(text))
+			return self.hedge.run(lambda: send(token), len(text), on_both_succeeded, permit)
 
-		if tts_data['status'] != 'success':
-			raise TTSError(f"TTS generation failed: {tts_data.get('error_details', 'Unknown error')}")
+		def post():
+			if self.rate_limiter is not None:
+				self.rate_limiter.acquire(len(text))
+			if self.quota_tracker is not None:
+				self.quota_tracker.reserve(len(text))
+				try:
+					sent = hedged(self.token, lambda: self.quota_tracker.charge(len(text)))
+				except QuotaExhaustedError:
+					self.quota_tracker.mark_exhausted(len(text))
+					raise
+				except BaseException:
+					self.quota_tracker.release(len(text))
+					raise
+				self.quota_tracker.commit(len(text))
+				return sent
+			if self.token_pool is None:
+				return hedged(self.token)
+			while True:
+				token = self.token_pool.acquire(len(text))
+				try:
+					sent = hedged(token, lambda: self.token_pool.charge(token, len(text)))
+				except QuotaExhaustedError:
+					self.token_pool.exhausted(token, len(text))
+					continue
+				except BaseException:
+					self.token_pool.release(token, len(text))
+					raise
+				self.token_pool.commit(token, len(text))
+				return sent
 
-		return TTSOrder(tts_data)
+		def create():
+			tts_data, timing = _run_with_retry(self.create_retry, post, on_retry)
+			order = TTSOrder(tts_data, self.transport, self.chunk_size, self.cache, key, self.download_retry, self.singleflight, self.on_timing, self.hooks)
+			order.create_retries = len(retries)
+			order.retry_wait = sum(retries)
+			order._record_timing('create', timing)
+			return order
 
+		if self.singleflight is None:
+			return create()
+		order, shared = self.singleflight.do('order', key, create)
+		return order
 
-	def get_token_status(self):
+
+	def get_token_status(self, token=None):
 		"""
 		Check the quota characters, used characters, quota reset date, and other information for the developer token.
 		
-		:param None
+		:param token: str, optional, the token to check. Default is None, which checks the client's token.
 		:return: dict, returns the JSON response containing the token status. Includes total quota characters, used characters, remaining characters, and next reset date.
 		"""
 		url = f"{self.base_url}get-token-status"
-		params = {'token': self.token}
-		response = requests.get(url, params=params)
+		params = {'token': token or self.token}
+		response = _hooked_request(self.hooks, 'get-token-status', self.transport.get, url, params=params)
 		return response.json()
+
+
+	def synthesize_many(self, items, max_workers=8, output_dir='.', filename_format='{index}', log_summary=None):
+		"""
+		Create orders and download their audio in a thread pool, yielding results as they complete.
+		At most 2 * max_workers jobs are queued at a time, so items may be a long or lazy iterable.
+
+		:param items: iterable of (text, voice_id) or (text, voice_id, params) tuples,
+		              params being a dict of optional create_tts_order parameters.
+		:param max_workers: int, number of worker threads. Default is 8.
+		:param output_dir: str, directory where audio files are saved. Default is the current directory.
+		:param filename_format: str, file name pattern without extension, formatted with the job index. Default is '{index}'.
+		:param log_summary: float, optional, seconds between two INFO records of the 'ttsmaker' logger counting the files
+		                    saved and failed so far, a last one being logged when the batch ends. Default is None, no summary.
+		:return: generator of BatchResult, in completion order. A failed job yields a BatchResult
+		         whose error is a TTSError instead of stopping the batch.
+		"""
+		summary = BatchSummary(log_summary) if log_summary else None
+
+		def run(index, job):
+			order = None
+			try:
+				text, voice_id, *rest = job
+				params = rest[0] if rest and rest[0] else {}
+				order = self.create_tts_order(text, voice_id, **params)
+				filename = os.path.join(output_dir, filename_format.format(index=index))
+				result = BatchResult(index, order, order.save_audio(filename), None)
+			except Exception as e:
+				error = e if isinstance(e, TTSError) else TTSError(f"TTS job {index} failed: {e}")
+				if error is not e:
+					error.__cause__ = e
+				result = BatchResult(index, order, None, error)
+			if summary is not None:
+				summary.add(result.filepath, result.error)
+			return result
+
+		jobs = enumerate(items)
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			pending = set()
+			try:
+				for index, job in jobs:
+					pending.add(executor.submit(run, index, job))
+					if len(pending) >= 2 * max_workers:
+						done, pending = wait(pending, return_when=FIRST_COMPLETED)
+						for future in done:
+							yield future.result()
+				while pending:
+					done, pending = wait(pending, return_when=FIRST_COMPLETED)
+					for future in done:
+						yield future.result()
+			finally:
+				for future in pending:
+					future.cancel()
+				if summary is not None:
+					summary.close()
+
+	def synthesize_long(self, text, voice_id, filename, max_chars=2000, max_workers=8, paragraph_pause=None, **params):
+		"""
+		Synthesize a long text by splitting it into chunks at paragraph and sentence boundaries,
+		synthesizing the chunks concurrently and joining their audio in order into a single file with concat_audio.
+
+		:param text: str, the text to be converted into speech.
+		:param voice_id: int, voice ID.
+		:param filename: str, file name, extension is not required as the audio file type will be used.
+		:param max_chars: int, maximum number of characters per order. Default is 2000.
+		:param max_workers: int, number of chunks synthesized at once. Default is 8.
+		:param paragraph_pause: float, optional, seconds of silence inserted between paragraphs. Paragraphs are then never
+		                        packed into the same chunk, and the pauses are added to the joined audio rather than
+		                        with text_paragraph_pause_time, so their number and length are not limited.
+		                        Supported for mp3, aac, ogg and opus.
+		:param params: optional create_tts_order parameters such as audio_format or audio_speed.
+		:return: str, the path of the saved file. If any chunk fails, its TTSError exception is raised.
+		"""
+		if paragraph_pause:
+			paragraphs = [split_text(paragraph, max_chars) for paragraph in split_paragraphs(text)]
+		else:
+			paragraphs = [split_text(text, max_chars)]
+		chunks = [chunk for paragraph in paragraphs for chunk in paragraph]
+		if not chunks:
+			raise TTSError("Cannot synthesize empty text")
+
+		paths = [None] * len(chunks)
+		with tempfile.TemporaryDirectory(dir=os.path.dirname(filename) or '.') as tmp_dir:
+			items = [(chunk, voice_id, params) for chunk in chunks]
+			for result in self.synthesize_many(items, max_workers=max_workers, output_dir=tmp_dir):
+				if result.error is not None:
+					raise result.error
+				paths[result.index] = result.filepath
+
+			sources, index = [], 0
+			for paragraph in paragraphs:
+				if sources:
+					sources.append(Pause(paragraph_pause))
+				sources.extend(paths[index:index + len(paragraph)])
+				index += len(paragraph)
+			filepath = f"{filename}{os.path.splitext(paths[0])[1]}"
+			concat_audio(sources, filepath)
+		return filepath
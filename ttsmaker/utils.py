@@ -0,0 +1,27 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Read once at import: os.umask can only be queried by setting it, which is not thread-safe.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_file(filepath):
+	"""
+	Open a temporary file next to filepath for binary writing, and rename it to filepath when the block exits without error.
+	:param filepath: str, the final path of the file.
+	"""
+	fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(filepath) or '.')
+	try:
+		os.chmod(tmp_path, 0o666 & ~_UMASK)
+		with os.fdopen(fd, 'wb') as f:
+			yield f
+		os.replace(tmp_path, filepath)
+	except BaseException:
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+		raise
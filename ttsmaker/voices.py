@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+
+from .ttsmaker import TTSError
+from .utils import atomic_file
+
+
+class VoiceCatalog:
+	"""
+	Indexed view of the voice list, fetched at most once per TTL.
+	A snapshot can be persisted to disk and is used on cold starts, or when the API cannot be reached.
+	"""
+
+	def __init__(self, client, ttl=3600, snapshot_path=None, retry_after=60):
+		"""
+		Initialize the VoiceCatalog class.
+		:param client: TTSMaker, the client used to fetch the full voice list.
+		:param ttl: float, number of seconds a fetched voice list stays fresh. Default is 3600.
+		:param snapshot_path: str, optional, JSON file the voice list is saved to after every fetch and loaded from on start.
+		:param retry_after: float, number of seconds a stale list is kept after a failed fetch before fetching again. Default is 60.
+		"""
+		self.client = client
+		self.ttl = ttl
+		self.snapshot_path = snapshot_path
+		self.retry_after = retry_after
+		self.fetched_at = 0
+		# Time before which a failed fetch is not retried
+		self.retry_at = 0
+		self._voices = {}
+		self._by_language = {}
+		self._by_gender = {}
+		self._by_name = {}
+		self._lock = threading.Lock()
+		if snapshot_path:
+			self.load_snapshot()
+
+	@property
+	def is_fresh(self):
+		return bool(self._voices) and time.time() - self.fetched_at < self.ttl
+
+	def _needs_fetch(self, force):
+		return force or not (self.is_fresh or (self._voices and time.time() < self.retry_at))
+
+	def _index(self, voices, fetched_at):
+		by_id, by_language, by_gender, by_name = {}, {}, {}, {}
+		for voice in voices:
+			if voice.get('id') is None:
+				continue
+			by_id[int(voice['id'])] = voice
+			languages = voice.get('language') or []
+			for language in [languages] if isinstance(languages, str) else languages:
+				by_language.setdefault(language.lower(), []).append(voice)
+			if voice.get('gender'):
+				by_gender.setdefault(str(voice['gender']).lower(), []).append(voice)
+			if voice.get('name'):
+				by_name.setdefault(voice['name'].lower(), []).append(voice)
+		self._voices, self._by_language, self._by_gender, self._by_name = by_id, by_language, by_gender, by_name
+		self.fetched_at = fetched_at
+
+	def load_snapshot(self):
+		"""
+		Load the voice list from snapshot_path, keeping its original fetch time.
+		:return: bool, True if a snapshot was loaded.
+		"""
+		try:
+			with open(self.snapshot_path, encoding='utf-8') as f:
+				snapshot = json.load(f)
+		except (OSError, ValueError):
+			return False
+		with self._lock:
+			self._index(snapshot.get('voices', []), snapshot.get('fetched_at', 0))
+		return True
+
+	def save_snapshot(self):
+		"""Write the current voice list to snapshot_path."""
+		snapshot = {'fetched_at': self.fetched_at, 'voices': list(self._voices.values())}
+		with atomic_file(self.snapshot_path) as f:
+			f.write(json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+
+	def refresh(self, force=False):
+		"""
+		Fetch the full voice list if the current one is stale.
+		If the fetch fails and a stale list is available, the stale list is kept for retry_after seconds
+		and no error is raised.
+		:param force: bool, fetch even if the current list is fresh. Default is False.
+		"""
+		if not self._needs_fetch(force):
+			return
+		with self._lock:
+			if not self._needs_fetch(force):
+				return
+			try:
+				response = self.client.get_voice_list(language=None)
+				voices = response.get('voices_detailed_list')
+				if response.get('status') != 'success' or voices is None:
+					raise TTSError(f"Failed to get voice list: {response.get('error_details', 'Unknown error')}")
+			except Exception:
+				if self._voices:
+					self.retry_at = time.time() + self.retry_after
+					return
+				raise
+			self._index(voices, time.time())
+		if self.snapshot_path:
+			self.save_snapshot()
+
+	def get(self, voice_id):
+		"""
+		:param voice_id: int, voice ID.
+		:return: dict, the voice details, or None if there is no such voice.
+		"""
+		self.refresh()
+		return self._voices.get(int(voice_id))
+
+	def __contains__(self, voice_id):
+		return self.get(voice_id) is not None
+
+	def __len__(self):
+		self.refresh()
+		return len(self._voices)
+
+	def __iter__(self):
+		self.refresh()
+		return iter(list(self._voices.values()))
+
+	def by_language(self, language):
+		"""
+		:param language: str, language code such as 'zh' or 'en'.
+		:return: list of dict, the voices supporting the language.
+		"""
+		self.refresh()
+		return list(self._by_language.get(language.lower(), []))
+
+	def by_gender(self, gender):
+		"""
+		:param gender: str, gender as reported by the API.
+		:return: list of dict, the voices of that gender.
+		"""
+		self.refresh()
+		return list(self._by_gender.get(str(gender).lower(), []))
+
+	def by_name(self, name):
+		"""
+		:param name: str, voice name, case-insensitive.
+		:return: list of dict, the voices with that name.
+		"""
+		self.refresh()
+		return list(self._by_name.get(name.lower(), []))
+
+	def validate(self, voice_id):
+		"""
+		Check that voice_id exists. A TTSError exception is raised if it does not.
+		:param voice_id: int, voice ID.
+		:return: dict, the voice details.
+		"""
+		try:
+			voice = self.get(voice_id)
+		except (TypeError, ValueError):
+			voice = None
+		if voice is None:
+			raise TTSError(f"Unknown voice_id: {voice_id}")
+		return voice